@@ -1,34 +1,207 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
 import google.generativeai as genai
 from datetime import datetime
 import uuid
-from supabase import create_client
+from supabase import ClientOptions, create_client
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
 from dotenv import load_dotenv
-import requests
+import httpx
 from tagging import auto_tags_from_google
 import re
+import string
 import math
 import difflib
-import json
+import orjson
+from decimal import Decimal
+import logging
+import threading
+import time
+import hashlib
+import hmac
+import heapq
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for jsonify() and request.json."""
+
+    options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_orjson_default, option=self.options)
+        return self._app.response_class(body, mimetype="application/json")
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 load_dotenv()
 
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 # Configure Gemini API
 genai.configure(api_key=os.environ.get("GOOGLE_API_KEY"))
-model = genai.GenerativeModel('gemini-2.5-flash-lite')
+GEMINI_MODEL_NAME = 'gemini-2.5-flash-lite'
+model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+# Gemini calls block the request thread for seconds; cap how many run at once so a
+# burst of chats queues here instead of tripping the API rate limit.
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))
+gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ttl seconds after being set."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+gemini_calls = SingleFlight()
+
+# Repeat questions build byte-identical prompts; answer those from memory instead of Gemini.
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "5000"))
+llm_response_cache = TTLCache(maxsize=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL_SECONDS)
 
 # Configure Supabase Client
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_ANON_KEY")
 PLACES_KEY = os.getenv("GOOGLE_API_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# One pooled HTTP/2 client for all PostgREST calls (h2 comes from httpx[http2] in
+# requirements.txt); keep idle connections around long enough that back-to-back chats
+# skip the TLS handshake.
+supabase_http = httpx.Client(
+    http2=True,
+    timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=50, keepalive_expiry=60),
+)
+supabase = create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(httpx_client=supabase_http))
+
+# Concurrent identical Supabase reads (e.g. a tag-cache refresh) share one request.
+supabase_reads = SingleFlight()
+
+# Pooled HTTP/2 client (h2 via httpx[http2]) for the Google Maps web services, shared by
+# all request threads.
+# retries=2 re-attempts failed connects (DNS/TCP/TLS) on a fresh connection; HTTP error
+# responses are returned as-is.
+google_maps = httpx.Client(
+    base_url="https://maps.googleapis.com",
+    timeout=20,
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60),
+    ),
+)
 
-# In-memory storage for conversations (temporary - no database)
-conversations = {}
+# Users keep asking about the same neighbourhoods; places don't move, so keep resolved
+# "near X" coordinates for a day.
+GEOCODE_CACHE_TTL_SECONDS = int(os.environ.get("GEOCODE_CACHE_TTL_SECONDS", "86400"))
+geocode_cache = TTLCache(maxsize=10000, ttl=GEOCODE_CACHE_TTL_SECONDS)
+
+# Shared pool for fanning out independent Google Places lookups within a request.
+google_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="google-places")
+
+# Only the most recent turns are kept per session (user + assistant messages).
+MAX_HISTORY_MESSAGES = int(os.environ.get("MAX_HISTORY_MESSAGES", "20"))
+# Sessions idle for longer than this are dropped.
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", "3600"))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "10000"))
+
+# In-memory storage for conversations (used when REDIS_URL is not set); bounded so a
+# long-running server doesn't accumulate abandoned sessions.
+conversations = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL_SECONDS)
+
+# With REDIS_URL set, history lives in Redis so several workers/replicas can share sessions.
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = None
+if REDIS_URL:
+    if redis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed; keeping sessions in memory")
+    else:
+        redis_client = redis.Redis.from_url(REDIS_URL)
+
+# Session id -> last write time, so /api/health can count live sessions without a SCAN.
+ACTIVE_SESSIONS_KEY = "sessions:active"
+
+# The tags table changes rarely, so serve it from memory and refresh every few minutes.
+TAG_CACHE_TTL_SECONDS = int(os.environ.get("TAG_CACHE_TTL_SECONDS", "300"))
+tag_cache = {"names": [], "lower": set(), "lookup": {}, "expires_at": 0.0}
+# Shared secret for /api/admin/* endpoints; those endpoints are disabled while unset.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
 PRICE_LEVEL_TO_TAG = {
     0: "Free",
@@ -41,21 +214,21 @@ PRICE_LEVEL_TO_TAG = {
 PRICE_TAG_TO_LEVEL = {v: k for k, v in PRICE_LEVEL_TO_TAG.items()}
 
 PRICE_TAG_ALIASES = {
-    "Free": ["free"],
-    "Budget": ["cheap", "budget", "affordable", "economical", "low cost", "low-cost"],
-    "Mid-Range": ["mid range", "mid-range", "moderate", "reasonably priced", "not too expensive"],
-    "Expensive": ["expensive", "pricey", "high price", "high-priced"],
-    "Premium": ["premium", "luxury", "high end", "high-end", "fine dining", "very expensive"],
+    "Free": ("free",),
+    "Budget": ("cheap", "budget", "affordable", "economical", "low cost", "low-cost"),
+    "Mid-Range": ("mid range", "mid-range", "moderate", "reasonably priced", "not too expensive"),
+    "Expensive": ("expensive", "pricey", "high price", "high-priced"),
+    "Premium": ("premium", "luxury", "high end", "high-end", "fine dining", "very expensive"),
 }
 
-IGNORED_QUERY_TAGS = {
+IGNORED_QUERY_TAGS = frozenset({
     "Restaurant",
-}
+})
 
-BUDGET_TAGS = set(PRICE_LEVEL_TO_TAG.values())
+BUDGET_TAGS = frozenset(PRICE_LEVEL_TO_TAG.values())
 
 # Food-type tags that should count as the "cuisine" slot in strict tag mode.
-CUISINE_TAGS = {
+CUISINE_TAGS = frozenset({
     "African", "American", "Asian", "Bakery", "Bar", "BBQ", "Brunch", "Bubble Tea",
     "Buffet", "Burgers", "Cafe", "Chinese", "Deli", "Dessert", "Dim Sum", "Diner",
     "Fast Food", "French", "Fusion", "Halal", "Hawaiian", "Hotpot / Steamboat",
@@ -64,10 +237,10 @@ CUISINE_TAGS = {
     "Moroccan", "Pizza", "Ramen", "Salad Shop", "Sandwiches", "Seafood",
     "Singaporean", "Spanish", "Steakhouse", "Sushi", "Taiwanese", "Tea House",
     "Thai", "Vegetarian", "Vietnamese", "Western",
-}
+})
 
 # Tags that should not be treated as the required "location" slot.
-NON_LOCATION_TAGS = (
+NON_LOCATION_TAGS = frozenset(
     BUDGET_TAGS
     | CUISINE_TAGS
     | {
@@ -77,38 +250,77 @@ NON_LOCATION_TAGS = (
     }
 )
 
+NON_MATCH_CHARS_RE = re.compile(r"[^a-z0-9$\s]")
+WHITESPACE_RE = re.compile(r"\s+")
+DOLLAR_RUN_RE = re.compile(r"\$+")
+
+# Length of an exact "$" run -> canonical price tag ("$$$$$" matches nothing).
+DOLLAR_RUN_TO_TAG = {
+    4: "Premium",
+    3: "Expensive",
+    2: "Mid-Range",
+    1: "Budget",
+}
+
+# ASCII chars outside [a-z0-9$] and whitespace become spaces (covers "-" too).
+MATCH_TRANSLATION = str.maketrans({
+    c: " " for c in map(chr, range(128))
+    if not (c in string.ascii_lowercase or c in string.digits or c == "$" or c.isspace())
+})
+
 def normalize_text_for_match(text: str) -> str:
     text = (text or "").lower()
+    if text.isascii():
+        # Fast path for typical input: one translate plus split/join instead of two regex passes.
+        return " ".join(text.translate(MATCH_TRANSLATION).split())
+
     text = text.replace("-", " ")
-    text = re.sub(r"[^a-z0-9$\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
+    text = NON_MATCH_CHARS_RE.sub(" ", text)
+    text = WHITESPACE_RE.sub(" ", text).strip()
     return text
 
-def contains_phrase(normalized_text: str, phrase: str) -> bool:
-    p = normalize_text_for_match(phrase)
-    if not p:
-        return False
-    return f" {p} " in f" {normalized_text} "
+# Normalized alias -> rank of its canonical tag in PRICE_TAG_ALIASES (earlier tags win).
+PRICE_ALIAS_RANK = {}
+for _rank, _aliases in enumerate(PRICE_TAG_ALIASES.values()):
+    for _alias in _aliases:
+        PRICE_ALIAS_RANK.setdefault(normalize_text_for_match(_alias), _rank)
+PRICE_ALIAS_CANONICALS = tuple(PRICE_TAG_ALIASES)
+
+# Runs against normalized text, so words are delimited by single spaces. The lookahead
+# reports aliases that overlap (e.g. "expensive" inside "very expensive").
+PRICE_ALIAS_RE = re.compile(
+    r"(?<![^ ])(?=("
+    + "|".join(re.escape(a) for a in sorted(PRICE_ALIAS_RANK, key=len, reverse=True))
+    + r")(?![^ ]))"
+)
 
-def detect_canonical_price_tag(message: str) -> str | None:
-    raw = (message or "").lower()
-    normalized = normalize_text_for_match(message or "")
+FILTER_CUISINES = ["japanese", "korean", "chinese", "western", "thai", "indian"]
+
+# Single pass over the message for extract_filtering_rules. Each branch sits inside a
+# lookahead so keywords that overlap (e.g. "western" + "near" in "westernear") are all seen.
+FILTER_RULES_RE = re.compile(
+    r"(?=\$(?P<amount>\d+)"
+    r"|(?P<dietary>halal|vegetarian)"
+    r"|(?P<cuisine>" + "|".join(FILTER_CUISINES) + r")"
+    r"|near(?P<location>.*))",
+    re.DOTALL,
+)
+
+def detect_canonical_price_tag(message: str, normalized: str | None = None) -> str | None:
+    """`normalized` may carry normalize_text_for_match(message) when the caller already has it."""
+    raw = message or ""
 
     # Prefer explicit dollar notation, longest first.
-    dollar_map = [
-        ("$$$$", "Premium"),
-        ("$$$", "Expensive"),
-        ("$$", "Mid-Range"),
-        ("$", "Budget"),
-    ]
-    for symbol, canonical in dollar_map:
-        if re.search(rf"(?<!\$){re.escape(symbol)}(?!\$)", raw):
-            return canonical
+    runs = [len(run) for run in DOLLAR_RUN_RE.findall(raw) if len(run) in DOLLAR_RUN_TO_TAG]
+    if runs:
+        return DOLLAR_RUN_TO_TAG[max(runs)]
 
     # Then match common natural-language variants.
-    for canonical, aliases in PRICE_TAG_ALIASES.items():
-        if any(contains_phrase(normalized, alias) for alias in aliases):
-            return canonical
+    if normalized is None:
+        normalized = normalize_text_for_match(raw)
+    ranks = [PRICE_ALIAS_RANK[m.group(1)] for m in PRICE_ALIAS_RE.finditer(normalized)]
+    if ranks:
+        return PRICE_ALIAS_CANONICALS[min(ranks)]
 
     return None
 
@@ -125,26 +337,93 @@ def haversine_km(lat1, lon1, lat2, lon2):
 
     return R * c
 
-def get_all_tag_names():
+def haversine_km_from(lat1, lon1):
+    """Fix the origin once; the returned function matches haversine_km(lat1, lon1, lat2, lon2)."""
+    R = 6371  # Earth radius in km
+    cos_phi1 = math.cos(math.radians(lat1))
+
+    def distance_to(lat2, lon2):
+        dphi = math.radians(lat2 - lat1)
+        dlambda = math.radians(lon2 - lon1)
+        a = math.sin(dphi/2)**2 + cos_phi1 * math.cos(math.radians(lat2)) * math.sin(dlambda/2)**2
+        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        return R * c
+
+    return distance_to
+
+def build_tag_phrase_index(tag_names):
+    """Map each normalized tag phrase to its (rank, tag) entries; rank keeps longest-tag-first order."""
+    phrase_index = {}
+    max_phrase_words = 0
+    for rank, tag in enumerate(sorted(tag_names, key=len, reverse=True)):
+        if tag in IGNORED_QUERY_TAGS:
+            continue
+        phrase = normalize_text_for_match(tag)
+        if not phrase:
+            continue
+        phrase_index.setdefault(phrase, []).append((rank, tag))
+        max_phrase_words = max(max_phrase_words, phrase.count(" ") + 1)
+    return phrase_index, max_phrase_words
+
+def get_tag_cache():
+    cache = tag_cache
+    if time.monotonic() < cache["expires_at"]:
+        return cache
+    return supabase_reads.do("tags", refresh_tag_cache)
+
+def refresh_tag_cache():
+    global tag_cache
+    # Another thread may have refreshed while this one waited to lead.
+    cache = tag_cache
+    if time.monotonic() < cache["expires_at"]:
+        return cache
+
     response = supabase.table("tags").select("name").execute()
     tags = [t["name"] for t in response.data]
-    return tags, {t.lower() for t in tags}
+    phrase_index, max_phrase_words = build_tag_phrase_index(tags)
+    # The catalog and its prompt block only change with the tag list, so build them here.
+    catalog = build_tag_catalog(tags)
+    cache = {
+        "names": tags,
+        "lower": {t.lower() for t in tags},
+        "lookup": {t.lower(): t for t in tags},
+        "phrase_index": phrase_index,
+        "max_phrase_words": max_phrase_words,
+        "catalog": catalog,
+        "allowed_tags_prompt": build_allowed_tags_prompt(catalog),
+        "expires_at": time.monotonic() + TAG_CACHE_TTL_SECONDS,
+    }
+    tag_cache = cache
+    return cache
+
+def invalidate_tag_cache():
+    global tag_cache
+    # Swap in an expired copy; the next reader refreshes from Supabase.
+    tag_cache = {**tag_cache, "expires_at": 0.0}
+
+def get_all_tag_names():
+    cache = get_tag_cache()
+    return cache["names"], cache["lower"]
 
 def extract_tags_from_message(user_message):
-    tag_names, _ = get_all_tag_names()
+    cache = get_tag_cache()
     normalized_user_text = normalize_text_for_match(user_message or "")
-    tag_lookup = {t.lower(): t for t in tag_names}
-
-    # Phrase-based matching reduces accidental partial matches.
-    matched_tags = []
-    for tag in sorted(tag_names, key=len, reverse=True):
-        if tag in IGNORED_QUERY_TAGS:
-            continue
-        if contains_phrase(normalized_user_text, tag):
-            matched_tags.append(tag)
+    tag_lookup = cache["lookup"]
+
+    # Phrase-based matching reduces accidental partial matches. Every word run of the
+    # message up to the longest tag is looked up once, instead of scanning per tag.
+    phrase_index = cache["phrase_index"]
+    max_phrase_words = cache["max_phrase_words"]
+    words = normalized_user_text.split(" ") if normalized_user_text else []
+    hits = {}
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + max_phrase_words, len(words)) + 1):
+            for rank, tag in phrase_index.get(" ".join(words[start:end]), ()):
+                hits[rank] = tag
+    matched_tags = [hits[rank] for rank in sorted(hits)]
 
     # Map "$", "$$", "mid range", etc. -> one canonical price tag if present in DB.
-    canonical_price_tag = detect_canonical_price_tag(user_message or "")
+    canonical_price_tag = detect_canonical_price_tag(user_message or "", normalized_user_text)
     if canonical_price_tag:
         actual_tag = tag_lookup.get(canonical_price_tag.lower())
         if actual_tag and actual_tag not in matched_tags:
@@ -169,22 +448,23 @@ def classify_required_tags(matched_tags):
 
     return selected
 
+LOCATION_PHRASE_RE = re.compile(r"\b(?:in|at|near)\s+([a-zA-Z0-9\s\-]+)", re.IGNORECASE)
+LOCATION_PHRASE_STOP_RE = re.compile(
+    r"\b(?:with|for|under|budget|cheap|affordable|mid-range|mid range|expensive|premium)\b",
+    re.IGNORECASE,
+)
+
 def extract_location_phrase_from_message(user_message):
     text = (user_message or "").strip()
     if not text:
         return None
 
-    m = re.search(r"\b(?:in|at|near)\s+([a-zA-Z0-9\s\-]+)", text, flags=re.IGNORECASE)
+    m = LOCATION_PHRASE_RE.search(text)
     if not m:
         return None
 
     phrase = m.group(1).strip(" .,!?:;")
-    phrase = re.split(
-        r"\b(?:with|for|under|budget|cheap|affordable|mid-range|mid range|expensive|premium)\b",
-        phrase,
-        maxsplit=1,
-        flags=re.IGNORECASE,
-    )[0].strip(" .,!?:;")
+    phrase = LOCATION_PHRASE_STOP_RE.split(phrase, maxsplit=1)[0].strip(" .,!?:;")
     return phrase or None
 
 def get_location_tags_from_all_tags(tag_names):
@@ -202,30 +482,35 @@ def suggest_location_tags(user_message, max_items=6):
 
     return difflib.get_close_matches(phrase, location_tags, n=max_items, cutoff=0.0)
 
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
+JSON_OBJECT_RE = re.compile(r"\{[\s\S]*\}")
+
 def parse_json_from_llm_text(text):
     text = (text or "").strip()
     if not text:
         return None
 
-    fence_match = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, flags=re.IGNORECASE)
+    fence_match = JSON_FENCE_RE.search(text)
     candidate = fence_match.group(1).strip() if fence_match else text
 
     try:
-        return json.loads(candidate)
+        return orjson.loads(candidate)
     except Exception:
         pass
 
     # Fallback: try to extract the first JSON object.
-    obj_match = re.search(r"\{[\s\S]*\}", text)
+    obj_match = JSON_OBJECT_RE.search(text)
     if obj_match:
         try:
-            return json.loads(obj_match.group(0))
+            return orjson.loads(obj_match.group(0))
         except Exception:
             return None
     return None
 
 def get_tag_catalog():
-    tag_names, _ = get_all_tag_names()
+    return get_tag_cache()["catalog"]
+
+def build_tag_catalog(tag_names):
     budgets = sorted([t for t in tag_names if t in BUDGET_TAGS])
     cuisines = sorted([t for t in tag_names if t in CUISINE_TAGS])
     locations = get_location_tags_from_all_tags(tag_names)
@@ -236,39 +521,111 @@ def get_tag_catalog():
         "locations": locations,
     }
 
-def llm_extract_required_tags(user_message, current_selected=None):
-    """Ask the LLM to map the query to exact DB tags, then validate strictly."""
-    catalog = get_tag_catalog()
-    current_selected = current_selected or {"cuisine": None, "location": None, "budget": None}
+# One GenerativeModel per static system instruction, so the fixed rules are sent as
+# system_instruction once per model instead of being pasted into every prompt string.
+instruction_models = {}
+
+def gemini_model_for(instructions=None):
+    if not instructions:
+        return model
+    llm = instruction_models.get(instructions)
+    if llm is None:
+        llm = instruction_models[instructions] = genai.GenerativeModel(
+            GEMINI_MODEL_NAME, system_instruction=instructions
+        )
+    return llm
+
+def _generate_text_uncoalesced(parts, instructions=None):
+    llm = gemini_model_for(instructions)
+    with gemini_slots:
+        response = llm.generate_content([{"role": "user", "parts": parts}])
+    return getattr(response, "text", "")
+
+def generate_text(parts, instructions=None):
+    """parts: one prompt string or a list of text parts; put parts shared across requests first."""
+    if isinstance(parts, str):
+        parts = [parts]
+    key_source = "\x00".join([instructions or "", *parts])
+    key = hashlib.blake2b(key_source.encode("utf-8"), digest_size=16).hexdigest()
+    cached = llm_response_cache.get(key)
+    if cached is None:
+        cached = shared_llm_cache_get(key)
+        if cached is not None:
+            llm_response_cache.set(key, cached)
+    if cached is not None:
+        return cached
+
+    # Identical prompts arriving together (e.g. the same popular query) share one Gemini call.
+    text = gemini_calls.do(key, lambda: _generate_text_uncoalesced(parts, instructions))
+    if text:
+        llm_response_cache.set(key, text)
+        shared_llm_cache_set(key, text)
+    return text
 
-    prompt = f"""
+# With Redis configured, LLM answers are also shared across workers/replicas.
+def shared_llm_cache_get(key):
+    if redis_client is None:
+        return None
+    try:
+        value = redis_client.get(f"llm:{key}")
+    except Exception as e:
+        logger.warning("Redis LLM cache read failed: %s", e)
+        return None
+    return value.decode("utf-8") if value is not None else None
+
+def shared_llm_cache_set(key, text):
+    if redis_client is None:
+        return
+    try:
+        redis_client.set(f"llm:{key}", text, ex=LLM_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning("Redis LLM cache write failed: %s", e)
+
+# Fewer DB matches than this are not sent to the LLM for ranking; there is nothing to order.
+MIN_CANDIDATES_TO_RANK = int(os.environ.get("MIN_CANDIDATES_TO_RANK", "2"))
+
+TAG_EXTRACTION_INSTRUCTIONS = """
 You map a user food request into EXACT database tags.
 
 Rules:
 - Choose at most one tag for each category: cuisine, location, budget.
 - Output ONLY JSON with keys: cuisine, location, budget.
-- Values must be exact strings from the allowed lists below, or null.
+- Values must be exact strings from the allowed lists in the request, or null.
 - Do not invent tags.
+""".strip()
 
-User message:
-{user_message}
-
-Rule-based hints (may be incomplete):
-{json.dumps(current_selected, ensure_ascii=True)}
-
+def build_allowed_tags_prompt(catalog):
+    return f"""
 Allowed cuisine tags:
-{json.dumps(catalog["cuisines"], ensure_ascii=True)}
+{orjson.dumps(catalog["cuisines"]).decode()}
 
 Allowed location tags:
-{json.dumps(catalog["locations"], ensure_ascii=True)}
+{orjson.dumps(catalog["locations"]).decode()}
 
 Allowed budget tags:
-{json.dumps(catalog["budgets"], ensure_ascii=True)}
+{orjson.dumps(catalog["budgets"]).decode()}
+""".strip()
+
+def llm_extract_required_tags(user_message, current_selected=None):
+    """Ask the LLM to map the query to exact DB tags, then validate strictly."""
+    cache = get_tag_cache()
+    catalog = cache["catalog"]
+    current_selected = current_selected or {"cuisine": None, "location": None, "budget": None}
+
+    # The allowed lists are identical for every request, so they go first as their own
+    # part; Gemini can then reuse the shared prefix (implicit caching) across users.
+    allowed_tags_part = cache["allowed_tags_prompt"]
+
+    request_part = f"""
+User message:
+{user_message}
+
+Rule-based hints (may be incomplete):
+{orjson.dumps(current_selected).decode()}
 """.strip()
 
     try:
-        response = model.generate_content(prompt)
-        payload = parse_json_from_llm_text(getattr(response, "text", ""))
+        payload = parse_json_from_llm_text(generate_text([allowed_tags_part, request_part], TAG_EXTRACTION_INSTRUCTIONS))
         if not isinstance(payload, dict):
             return None
 
@@ -285,7 +642,7 @@ Allowed budget tags:
             result["budget"] = budget
         return result
     except Exception as e:
-        print("LLM tag extraction failed:", str(e))
+        logger.warning("LLM tag extraction failed: %s", e)
         return None
 
 def merge_selected_tags(rule_selected, llm_selected):
@@ -313,9 +670,29 @@ def fetch_place_tags_map(place_ids):
             tag_map[pid] = sorted(set(tag_map[pid]))
         return tag_map
     except Exception as e:
-        print("Failed to fetch place tags for ranking:", str(e))
+        logger.warning("Failed to fetch place tags for ranking: %s", e)
         return {}
 
+RANKING_INSTRUCTIONS = """
+You are ranking restaurant recommendations from a pre-filtered database result.
+All candidates already match the required constraints.
+
+Rules:
+- Use ONLY the candidates provided.
+- Do NOT invent restaurants.
+- Return ONLY JSON with this shape:
+  {
+    "ordered_ids": [id1, id2, id3],
+    "reasons": {
+      "id1": "short reason",
+      "id2": "short reason"
+    }
+  }
+- `ordered_ids` must contain only ids from the provided candidates.
+- Return up to 3 ids.
+- Keep reasons short and grounded in the provided names/tags/address only.
+""".strip()
+
 def llm_rank_recommendations(user_message, required_tags, candidate_places):
     """Rank already-validated DB candidates and return explanations. Never expands the candidate set."""
     if not candidate_places:
@@ -332,37 +709,18 @@ def llm_rank_recommendations(user_message, required_tags, candidate_places):
     ]
 
     prompt = f"""
-You are ranking restaurant recommendations from a pre-filtered database result.
-All candidates already match the required constraints.
-
-Rules:
-- Use ONLY the candidates provided.
-- Do NOT invent restaurants.
-- Return ONLY JSON with this shape:
-  {{
-    "ordered_ids": [id1, id2, id3],
-    "reasons": {{
-      "id1": "short reason",
-      "id2": "short reason"
-    }}
-  }}
-- `ordered_ids` must contain only ids from the provided candidates.
-- Return up to 3 ids.
-- Keep reasons short and grounded in the provided names/tags/address only.
-
 User message:
 {user_message}
 
 Required tags:
-{json.dumps(required_tags, ensure_ascii=True)}
+{orjson.dumps(required_tags).decode()}
 
 Candidates:
-{json.dumps(candidate_payload, ensure_ascii=True)}
+{orjson.dumps(candidate_payload).decode()}
 """.strip()
 
     try:
-        response = model.generate_content(prompt)
-        payload = parse_json_from_llm_text(getattr(response, "text", ""))
+        payload = parse_json_from_llm_text(generate_text(prompt, RANKING_INSTRUCTIONS))
         if not isinstance(payload, dict):
             return None
 
@@ -390,13 +748,23 @@ Candidates:
 
         return {"ordered_ids": ordered_ids, "reasons": reasons}
     except Exception as e:
-        print("LLM ranking failed:", str(e))
+        logger.warning("LLM ranking failed: %s", e)
         return None
 
 def fetch_food_places_by_tags(tags, limit=5):
     if not tags:
         return []
 
+    # One RPC does the AND-match and the places lookup server-side (see supabase_functions.sql).
+    try:
+        res = supabase.rpc("get_places_by_all_tags", {"tag_names": list(tags), "lim": limit}).execute()
+        return res.data or []
+    except Exception as e:
+        logger.warning("get_places_by_all_tags RPC failed, falling back to per-tag queries: %s", e)
+
+    return fetch_food_places_by_tags_per_tag(tags, limit)
+
+def fetch_food_places_by_tags_per_tag(tags, limit=5):
     place_id_sets = []
 
     for tag in tags:
@@ -481,6 +849,16 @@ def format_required_tag_response(selected_tags, food_results, user_message=None)
     if not food_results:
         return "I couldn't find any restaurants in my database that match all 3 required tags: " + ", ".join(required_tags) + "."
 
+    if len(food_results) < MIN_CANDIDATES_TO_RANK:
+        # run_chat_turn skips the LLM ranking here, so reply in the same ranked layout with
+        # the tag match as the reason.
+        reason = "Matches all 3 required tags: " + ", ".join(required_tags) + "."
+        ranking = {
+            "ordered_ids": [f.get("id") for f in food_results],
+            "reasons": {f.get("id"): reason for f in food_results},
+        }
+        return format_llm_ranked_response(required_tags, food_results, ranking)
+
     lines = ["Here are restaurants that match all 3 required tags: " + ", ".join(required_tags)]
     for f in food_results[:3]:
         lines.append(
@@ -526,9 +904,8 @@ def format_llm_ranked_response(required_tags, candidate_places, ranking):
     return "\n".join(lines)
 
 def google_text_search(query: str, limit=5):
-    url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
     params = {"query": query, "key": PLACES_KEY}
-    r = requests.get(url, params=params, timeout=20)
+    r = google_maps.get("/maps/api/place/textsearch/json", params=params)
     data = r.json()
 
     if data.get("status") != "OK":
@@ -538,18 +915,15 @@ def google_text_search(query: str, limit=5):
     return results, None
 
 def google_place_details(place_id: str):
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
         "place_id": place_id,
         "fields": "name,types,editorial_summary,opening_hours,formatted_address,geometry,price_level,rating,url,photos",
         "key": PLACES_KEY
     }
-    r = requests.get(url, params=params, timeout=20)
+    r = google_maps.get("/maps/api/place/details/json", params=params)
     data = r.json()
 
-    # DEBUG (temporary): print what Google returns
-    print("DETAILS status:", data.get("status"))
-    print("DETAILS keys:", list((data.get("result") or {}).keys()))
+    logger.debug("DETAILS status: %s keys: %s", data.get("status"), list((data.get("result") or {}).keys()))
 
     if data.get("status") != "OK":
         return None, {"status": data.get("status"), "error": data.get("error_message")}
@@ -562,8 +936,26 @@ def google_photo_url(photo_ref: str, maxwidth=800):
         f"?maxwidth={maxwidth}&photo_reference={photo_ref}&key={PLACES_KEY}"
     )
 
+def geocode_location(location_query: str):
+    """Resolve a free-text place to (lat, lng) via Places text search, cached by normalized text."""
+    key = normalize_text_for_match(location_query)
+    origin = geocode_cache.get(key)
+    if origin is not None:
+        return origin
+
+    location_results, _ = google_text_search(location_query, limit=1)
+    if not location_results:
+        return None
+    location = location_results[0]["geometry"]["location"]
+    origin = (location["lat"], location["lng"])
+    geocode_cache.set(key, origin)
+    return origin
+
+# Columns apply_rules_to_db callers actually use; keeps PostgREST payloads small.
+PLACE_FILTER_COLUMNS = "id,name,address,gmaps_uri,latitude,longitude,price_level,types"
+
 def apply_rules_to_db(rules, limit=5):
-    query = supabase.table("places").select("*")
+    query = supabase.table("places").select(PLACE_FILTER_COLUMNS)
 
     # ----- PRICE FILTER -----
     if "budget_amount" in rules:
@@ -597,11 +989,28 @@ def apply_rules_to_db(rules, limit=5):
     if "location_query" in rules:
         loc = rules["location_query"]
 
-        location_results, _ = google_text_search(loc, limit=1)
-        if location_results:
-            first = location_results[0]
-            user_lat = first["geometry"]["location"]["lat"]
-            user_lng = first["geometry"]["location"]["lng"]
+        origin = geocode_location(loc)
+        if origin:
+            user_lat, user_lng = origin
+
+            # KNN sort in Postgres (see supabase_functions.sql); only `limit` rows come back
+            required_types = []
+            if "cuisine" in rules:
+                required_types.append(rules["cuisine"])
+            if rules.get("dietary") == "halal":
+                required_types.append("halal")
+            try:
+                res = supabase.rpc("nearest_places", {
+                    "user_lat": user_lat,
+                    "user_lng": user_lng,
+                    "lim": limit,
+                    "price_exact": rules.get("price_level_exact"),
+                    "max_price": None if "price_level_exact" in rules else rules.get("max_price"),
+                    "required_types": required_types,
+                }).execute()
+                return res.data or []
+            except Exception as e:
+                logger.warning("nearest_places RPC failed, sorting client-side: %s", e)
 
             # Pull a larger candidate pool first (adjust as needed)
             # You MUST have latitude/longitude columns in places table
@@ -609,21 +1018,18 @@ def apply_rules_to_db(rules, limit=5):
             rows = res.data or []
 
             # compute distance + filter within radius (optional)
+            distance_to = haversine_km_from(user_lat, user_lng)
             enriched = []
             for r in rows:
                 lat = r.get("latitude")
                 lng = r.get("longitude")
                 if lat is None or lng is None:
                     continue
-                dist_km = haversine_km(user_lat, user_lng, lat, lng)
-                r["distance_km"] = round(dist_km, 2)
+                r["distance_km"] = round(distance_to(lat, lng), 2)
                 enriched.append(r)
 
-            # sort by nearest
-            enriched.sort(key=lambda x: x["distance_km"])
-
-            # return only closest N
-            return enriched[:limit]
+            # return only closest N, nearest first (partial selection instead of a full sort)
+            return heapq.nsmallest(limit, enriched, key=lambda x: x["distance_km"])
 
     res = query.limit(limit).execute()
     return res.data
@@ -635,10 +1041,11 @@ def google_places_endpoint():
     if err:
         return jsonify(err), 400
 
+    # Details lookups are independent, so run them concurrently instead of one after another.
+    details_results = google_pool.map(google_place_details, [r["place_id"] for r in results])
+
     enriched = []
-    for r in results:
-        place_id = r["place_id"]
-        details, derr = google_place_details(place_id)
+    for details, derr in details_results:
         if derr:
             continue
 
@@ -661,13 +1068,26 @@ def extract_filtering_rules(message):
     message = message.lower()
     rules = {}
 
+    amount = None
+    dietary = set()
+    cuisine_rank = -1
+    location = None
+    for m in FILTER_RULES_RE.finditer(message):
+        kind = m.lastgroup
+        if kind == "amount":
+            if amount is None:
+                amount = int(m.group("amount"))
+        elif kind == "dietary":
+            dietary.add(m.group("dietary"))
+        elif kind == "cuisine":
+            cuisine_rank = max(cuisine_rank, FILTER_CUISINES.index(m.group("cuisine")))
+        elif location is None:
+            location = m.group("location").strip()
+
     # ----- BUDGET  -----
-    # 1) Always try to extract a number first (under $10, budget $20, <$15 etc.)
-    m = re.search(r"(?:under\s*)?\$?\s*(\d+)", message)
-    if "$" in message or "under" in message:
-        m2 = re.search(r"\$(\d+)", message)
-        if m2:
-            rules["budget_amount"] = int(m2.group(1))
+    # 1) Always try to extract a number first (budget $20, <$15 etc.)
+    if amount is not None:
+        rules["budget_amount"] = amount
 
     # 2) If no explicit number, fall back to keywords
     if "budget_amount" not in rules:
@@ -676,105 +1096,165 @@ def extract_filtering_rules(message):
             rules["price_level_exact"] = PRICE_TAG_TO_LEVEL[canonical_price_tag]
 
     # ----- DIETARY -----
-    if "halal" in message:
-        rules["dietary"] = "halal"
-    if "vegetarian" in message:
+    if "vegetarian" in dietary:
         rules["dietary"] = "vegetarian"
+    elif "halal" in dietary:
+        rules["dietary"] = "halal"
 
     # ----- CUISINE -----
-    cuisines = ["japanese", "korean", "chinese", "western", "thai", "indian"]
-    for c in cuisines:
-        if c in message:
-            rules["cuisine"] = c
+    # Later entries in FILTER_CUISINES win when several are mentioned
+    if cuisine_rank >= 0:
+        rules["cuisine"] = FILTER_CUISINES[cuisine_rank]
 
     # ----- DISTANCE -----
-    if "near" in message:
-        rules["location_query"] = message.split("near", 1)[1].strip()
+    if location is not None:
+        rules["location_query"] = location
 
     return rules
 
+def append_message(session_id, role, content):
+    message = {
+        'role': role,
+        'content': content,
+        'timestamp': datetime.now().isoformat()
+    }
+
+    if redis_client is not None:
+        key = f"sess:{session_id}"
+        pipe = redis_client.pipeline()
+        pipe.rpush(key, orjson.dumps(message))
+        pipe.ltrim(key, -MAX_HISTORY_MESSAGES, -1)
+        pipe.expire(key, SESSION_TTL_SECONDS)
+        now = time.time()
+        pipe.zadd(ACTIVE_SESSIONS_KEY, {session_id: now})
+        pipe.zremrangebyscore(ACTIVE_SESSIONS_KEY, "-inf", now - SESSION_TTL_SECONDS)
+        pipe.execute()
+        return
+
+    history = conversations.get(session_id)
+    if history is None:
+        # Sliding window: the deque drops the oldest turns once the session exceeds the cap
+        history = deque(maxlen=MAX_HISTORY_MESSAGES)
+    history.append(message)
+    # Re-setting refreshes the session's idle TTL and LRU position
+    conversations.set(session_id, history)
+
+def clear_session(session_id):
+    if redis_client is not None:
+        pipe = redis_client.pipeline()
+        pipe.delete(f"sess:{session_id}")
+        pipe.zrem(ACTIVE_SESSIONS_KEY, session_id)
+        pipe.execute()
+    else:
+        conversations.set(session_id, deque(maxlen=MAX_HISTORY_MESSAGES))
+
+def active_session_count():
+    if redis_client is not None:
+        # Members older than the session TTL belong to expired histories.
+        return redis_client.zcount(ACTIVE_SESSIONS_KEY, time.time() - SESSION_TTL_SECONDS, "+inf")
+    return len(conversations)
+
+def run_chat_turn(session_id, user_message):
+    """Yield the reply as it improves: the DB-backed answer first, then the LLM-ranked one."""
+    # Add user message to history (creates the session if new)
+    append_message(session_id, 'user', user_message)
+    
+    matched_tags = extract_tags_from_message(user_message)
+    selected_tags = classify_required_tags(matched_tags)
+
+    # Hybrid parsing: use LLM to fill missing required tags, but validate against DB tag lists.
+    if any(selected_tags[k] is None for k in ("cuisine", "location", "budget")):
+        llm_selected = llm_extract_required_tags(user_message, selected_tags)
+        selected_tags = merge_selected_tags(selected_tags, llm_selected)
+
+    required_tags = [selected_tags["cuisine"], selected_tags["location"], selected_tags["budget"]]
+    required_tags = [t for t in required_tags if t]
+
+    food_results = fetch_food_places_by_tags(required_tags, limit=10) if len(required_tags) == 3 else []
+    logger.debug("MATCHED TAGS: %s", matched_tags)
+    logger.debug("REQUIRED TAGS: %s", required_tags)
+    logger.debug("FINAL FILTERED RESULTS: %s", food_results)
+
+    # Strict deterministic gating: require cuisine + location + budget, and DB AND-match exactly those 3 tags.
+    assistant_message = format_required_tag_response(selected_tags, food_results, user_message)
+
+    # If we have valid DB matches, use the LLM only to rank/explain the candidates (never to invent places).
+    # A single match has nothing to rank, so skip the Gemini round trip.
+    if len(required_tags) == 3 and len(food_results) >= MIN_CANDIDATES_TO_RANK:
+        # The ranking call takes seconds; let streaming clients show the plain list meanwhile.
+        yield assistant_message
+
+        # get_places_by_all_tags already returns each place's tags; only the per-tag
+        # fallback path needs the extra lookup.
+        place_tags_map = {}
+        if any("tags" not in p for p in food_results):
+            place_ids = [p.get("id") for p in food_results if p.get("id") is not None]
+            place_tags_map = fetch_place_tags_map(place_ids)
+        rank_candidates = []
+        for p in food_results:
+            p_copy = dict(p)
+            p_copy["tags"] = p.get("tags") or place_tags_map.get(p.get("id"), [])
+            rank_candidates.append(p_copy)
+
+        ranking = llm_rank_recommendations(user_message, required_tags, rank_candidates)
+        llm_message = format_llm_ranked_response(required_tags, rank_candidates, ranking)
+        if llm_message:
+            assistant_message = llm_message
+    
+    # Add assistant message to history
+    append_message(session_id, 'assistant', assistant_message)
+
+    yield assistant_message
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
     user_message = data.get('message')
     session_id = data.get('session_id')
-    rules = extract_filtering_rules(user_message)
-    print("FILTERING RULES (debug only; chat uses tag matching):", rules)
 
-    
     if not user_message or not session_id:
         return jsonify({"error": "Missing message or session_id"}), 400
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("FILTERING RULES (debug only; chat uses tag matching): %s", extract_filtering_rules(user_message))
     
     try:
-        # Initialize conversation history if new session
-        if session_id not in conversations:
-            conversations[session_id] = []
-        
-        # Add user message to history
-        conversations[session_id].append({
-            'role': 'user',
-            'content': user_message,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Build context from history
-        context = ""
-        for msg in conversations[session_id][:-1]:  # Exclude current message
-            context += f"{msg['role']}: {msg['content']}\n"
-        
-        matched_tags = extract_tags_from_message(user_message)
-        selected_tags = classify_required_tags(matched_tags)
-
-        # Hybrid parsing: use LLM to fill missing required tags, but validate against DB tag lists.
-        if any(selected_tags[k] is None for k in ("cuisine", "location", "budget")):
-            llm_selected = llm_extract_required_tags(user_message, selected_tags)
-            selected_tags = merge_selected_tags(selected_tags, llm_selected)
-
-        required_tags = [selected_tags["cuisine"], selected_tags["location"], selected_tags["budget"]]
-        required_tags = [t for t in required_tags if t]
-
-        food_results = fetch_food_places_by_tags(required_tags, limit=10) if len(required_tags) == 3 else []
-        # Debug
-        print("MATCHED TAGS:", matched_tags)
-        print("REQUIRED TAGS:", required_tags)
-        print("FINAL FILTERED RESULTS:", food_results)
-
-        # Strict deterministic gating: require cuisine + location + budget, and DB AND-match exactly those 3 tags.
-        assistant_message = format_required_tag_response(selected_tags, food_results, user_message)
-
-        # If we have valid DB matches, use the LLM only to rank/explain the candidates (never to invent places).
-        if len(required_tags) == 3 and food_results:
-            place_ids = [p.get("id") for p in food_results if p.get("id") is not None]
-            place_tags_map = fetch_place_tags_map(place_ids)
-            rank_candidates = []
-            for p in food_results:
-                p_copy = dict(p)
-                p_copy["tags"] = place_tags_map.get(p.get("id"), [])
-                rank_candidates.append(p_copy)
-
-            ranking = llm_rank_recommendations(user_message, required_tags, rank_candidates)
-            llm_message = format_llm_ranked_response(required_tags, rank_candidates, ranking)
-            if llm_message:
-                assistant_message = llm_message
-        
-        # Add assistant message to history
-        conversations[session_id].append({
-            'role': 'assistant',
-            'content': assistant_message,
-            'timestamp': datetime.now().isoformat()
-        })
+        for assistant_message in run_chat_turn(session_id, user_message):
+            pass
         
         return jsonify({"response": assistant_message})
     
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Chat request failed")
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /api/chat, but sends each reply as a Server-Sent Event as soon as it is ready."""
+    data = request.json
+    user_message = data.get('message')
+    session_id = data.get('session_id')
+
+    if not user_message or not session_id:
+        return jsonify({"error": "Missing message or session_id"}), 400
+
+    def events():
+        try:
+            for assistant_message in run_chat_turn(session_id, user_message):
+                yield f"data: {app.json.dumps({'response': assistant_message})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.exception("Chat request failed")
+            yield f"event: error\ndata: {app.json.dumps({'error': f'An error occurred: {str(e)}'})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/api/session', methods=['POST'])
 def create_session():
     try:
         session_id = str(uuid.uuid4())
-        conversations[session_id] = []
+        clear_session(session_id)
         return jsonify({"session_id": session_id})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -783,10 +1263,20 @@ def create_session():
 def health():
     return jsonify({
         "status": "healthy",
-        "active_sessions": len(conversations),
+        "active_sessions": active_session_count(),
         "gemini_configured": os.environ.get("GOOGLE_API_KEY") is not None
     })
 
+@app.post("/api/admin/invalidate-tags")
+def invalidate_tags():
+    """Drop the cached tag list, e.g. right after auto_tag_places.py writes new tags."""
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({"error": "forbidden"}), 403
+
+    invalidate_tag_cache()
+    return jsonify({"status": "ok"})
+
 @app.get("/api/google-details-by-placeid")
 def google_details_by_placeid():
     place_id = request.args.get("place_id")
@@ -16,18 +16,32 @@ from __future__ import annotations
 import argparse
 import ast
 import csv
-import json
+import gzip
 import os
 import re
+import sqlite3
+import threading
 import time
 import urllib.parse
 import urllib.request
-from dataclasses import dataclass
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from functools import cached_property, lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, DefaultDict, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
+import ahocorasick
+import orjson
 from openpyxl import load_workbook
 
+try:
+    # Optional Rust xlsx reader (pip install python-calamine); much faster than openpyxl.
+    from python_calamine import CalamineWorkbook
+except Exception:
+    CalamineWorkbook = None  # type: ignore[assignment,misc]
+
 try:
     from dotenv import load_dotenv
 except Exception:
@@ -136,8 +150,8 @@ AREA_COMPONENT_TYPES = (
 )
 
 POINT_WKT_RE = re.compile(r"^\s*point\s*\(.+\)\s*$", re.IGNORECASE)
-NON_ASCII_RE = re.compile(r"[^\x00-\x7F]")
 PRICE_NUMBER_RE = re.compile(r"\$(\d+(?:\.\d{1,2})?)")
+WHITESPACE_RE = re.compile(r"\s+")
 
 PRICE_TAG_BUDGET = "Budget"
 PRICE_TAG_MID_RANGE = "Mid Range"
@@ -149,8 +163,43 @@ TAG_CATEGORY_ALLERGY = "allergy"
 TAG_CATEGORY_AREA = "area"
 
 
+class RowSignals:
+    """Per-row text and gmaps payload shared by the infer_* functions, parsed once per row."""
+
+    values: Dict[str, Any]
+    place_name: str
+    label_name: str
+    editorial_summary: str
+
+    @cached_property
+    def signal_text(self) -> str:
+        parts = [
+            self.place_name,
+            self.label_name,
+            self.editorial_summary,
+            extract_reviews_text(self.values.get("reviews")),
+        ]
+        return "\n".join(part for part in parts if part)
+
+    @cached_property
+    def normalized_text(self) -> str:
+        return normalize_row_text(self.signal_text)
+
+    @cached_property
+    def keyword_hits(self) -> Set[str]:
+        return scan_keywords(self.normalized_text)
+
+    @cached_property
+    def gmaps_payload(self) -> Any:
+        return safe_json_loads(self.values.get("gmaps_response"))
+
+    @cached_property
+    def gmaps_area(self) -> str:
+        return sanitize_area_candidate(extract_area_from_gmaps_response(self.gmaps_payload) or "")
+
+
 @dataclass
-class DatasetRow:
+class DatasetRow(RowSignals):
     row_num: int
     values: Dict[str, Any]
 
@@ -192,7 +241,7 @@ class DatasetRow:
 
 
 @dataclass
-class PlaceRow:
+class PlaceRow(RowSignals):
     row_num: int
     values: Dict[str, Any]
 
@@ -233,12 +282,95 @@ class PlaceRow:
         return to_float(self.values.get("longitude"))
 
 
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` calls per second."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def geocode_key(lat: float, lng: float) -> Tuple[float, float]:
+    # 4 decimal places is ~11 m, plenty for an area tag.
+    return round(lat, 4), round(lng, 4)
+
+
 class GoogleReverseGeocoder:
-    def __init__(self, api_key: str, delay_sec: float = 0.03) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        rate_per_sec: float = 40.0,
+        max_workers: int = 20,
+        cache_path: Optional[Path] = None,
+        commit_every: int = 100,
+    ) -> None:
         self.api_key = api_key
-        self.delay_sec = delay_sec
+        self.max_workers = max_workers
+        # Google's Geocoding quota is ~50 QPS; stay under it.
+        self.limiter = RateLimiter(rate_per_sec, burst=max_workers)
+        self.cache: Dict[Tuple[float, float], Optional[str]] = {}
+
+        # Areas found on earlier runs persist in SQLite so re-runs skip the API.
+        self.db: Optional[sqlite3.Connection] = None
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        if cache_path is not None:
+            self.db = sqlite3.connect(str(cache_path))
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS geocache(lat REAL, lng REAL, area TEXT, PRIMARY KEY(lat, lng))"
+            )
+            for lat, lng, area in self.db.execute("SELECT lat, lng, area FROM geocache"):
+                self.cache[(lat, lng)] = area
+
+    def prefetch(self, coords: Iterable[Tuple[float, float]]) -> None:
+        """Reverse-geocode coordinates concurrently so reverse_area() hits the cache."""
+        pending = list(dict.fromkeys(geocode_key(*c) for c in coords))
+        pending = [c for c in pending if c not in self.cache]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for coord, area in zip(pending, executor.map(lambda c: self.fetch_area(*c), pending)):
+                self.store(coord, area)
 
     def reverse_area(self, lat: float, lng: float) -> Optional[str]:
+        key = geocode_key(lat, lng)
+        if key not in self.cache:
+            self.store(key, self.fetch_area(*key))
+        return self.cache[key]
+
+    def store(self, key: Tuple[float, float], area: Optional[str]) -> None:
+        self.cache[key] = area
+        # Don't persist misses: None also covers network errors worth retrying next run.
+        if self.db is None or area is None:
+            return
+        self.db.execute("INSERT OR REPLACE INTO geocache(lat, lng, area) VALUES (?, ?, ?)", (*key, area))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.db.commit()
+            self.uncommitted = 0
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def fetch_area(self, lat: float, lng: float) -> Optional[str]:
         params = urllib.parse.urlencode(
             {
                 "latlng": f"{lat},{lng}",
@@ -247,14 +379,12 @@ class GoogleReverseGeocoder:
             }
         )
         url = f"https://maps.googleapis.com/maps/api/geocode/json?{params}"
+        self.limiter.acquire()
         try:
             with urllib.request.urlopen(url, timeout=8) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
+                payload = orjson.loads(resp.read())
         except Exception:
             return None
-        finally:
-            if self.delay_sec > 0:
-                time.sleep(self.delay_sec)
 
         if payload.get("status") != "OK":
             return None
@@ -271,22 +401,47 @@ class GoogleReverseGeocoder:
 
 
 def normalize_text(value: Any) -> str:
-    text = str(value or "").strip().lower()
-    return re.sub(r"\s+", " ", text)
+    return normalize_text_str(str(value or ""))
+
+
+def normalize_row_text(value: Any) -> str:
+    # Same result as normalize_text, uncached: row text, ids and addresses never repeat,
+    # and caching multi-KB review blobs would pin them for the whole run.
+    return fold_text(str(value or ""))
 
 
+# ASCII lowercase plus every ASCII char str.isspace() accepts folded to " ", in one C pass.
+ASCII_NORMALIZE_TABLE = str.maketrans(
+    {
+        **{chr(c): chr(c + 32) for c in range(ord("A"), ord("Z") + 1)},
+        **dict.fromkeys("\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f", " "),
+    }
+)
+
+
+def fold_text(text: str) -> str:
+    if not text.isascii():
+        return WHITESPACE_RE.sub(" ", text.strip().lower())
+    text = text.translate(ASCII_NORMALIZE_TABLE).strip()
+    return WHITESPACE_RE.sub(" ", text) if "  " in text else text
+
+
+# Tag and keyword names repeat across rows, so their normalizers are cached.
+@lru_cache(maxsize=20_000)
+def normalize_text_str(text: str) -> str:
+    return fold_text(text)
+
+
+@lru_cache(maxsize=20_000)
 def normalize_tag_name(value: str) -> str:
-    text = re.sub(r"\s+", " ", (value or "").strip())
-    return text
+    return WHITESPACE_RE.sub(" ", (value or "").strip())
 
 
+@lru_cache(maxsize=20_000)
 def is_english_tag(value: str) -> bool:
     candidate = normalize_tag_name(value)
-    if not candidate:
-        return False
-    if NON_ASCII_RE.search(candidate):
-        return False
-    return bool(re.search(r"[A-Za-z]", candidate))
+    # For ASCII text, isalpha() is exactly [A-Za-z].
+    return bool(candidate) and candidate.isascii() and any(ch.isalpha() for ch in candidate)
 
 
 def sanitize_area_candidate(value: str) -> Optional[str]:
@@ -322,15 +477,16 @@ def safe_json_loads(raw: Any) -> Any:
         return None
     if isinstance(raw, (dict, list)):
         return raw
-    text = str(raw).strip()
+    text = raw.strip() if isinstance(raw, str) else str(raw).strip()
     if not text:
         return None
 
     try:
-        return json.loads(text)
-    except Exception:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
         pass
 
+    # Python reprs (single quotes, None/True/False) from older exports.
     try:
         return ast.literal_eval(text)
     except Exception:
@@ -391,40 +547,64 @@ def extract_price_level_from_gmaps_response(raw_response: Any) -> Optional[int]:
         return None
 
 
+CUISINE_CANONICAL_KEYS: Dict[str, str] = {normalize_text(cuisine): cuisine for cuisine in CUISINE_KEYWORDS}
+
+
 def canonical_cuisine_name(name: str) -> str:
     key = normalize_text(name)
     if key in CUISINE_ALIASES:
         return CUISINE_ALIASES[key]
 
-    for cuisine in CUISINE_KEYWORDS:
-        if normalize_text(cuisine) == key:
-            return cuisine
+    cuisine = CUISINE_CANONICAL_KEYS.get(key)
+    if cuisine is not None:
+        return cuisine
 
     return name.strip()
 
 
+def build_keyword_index() -> Dict[str, List[Tuple[str, str]]]:
+    index: Dict[str, List[Tuple[str, str]]] = {}
+    for category, catalog in ((TAG_CATEGORY_CUISINE, CUISINE_KEYWORDS), (TAG_CATEGORY_ALLERGY, ALLERGY_KEYWORDS)):
+        for tag_name, keywords in catalog.items():
+            for kw in keywords:
+                kw_norm = normalize_text(kw)
+                if kw_norm:
+                    index.setdefault(kw_norm, []).append((category, tag_name))
+    return index
+
+
+# Normalized keyword -> every (category, tag) it votes for ("brunch" is both Western and Cafe).
+KEYWORD_TAGS = build_keyword_index()
+
+def build_keyword_automaton() -> Any:
+    automaton = ahocorasick.Automaton()
+    for kw in KEYWORD_TAGS:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+# Reports every keyword ending at each position in one pass, so overlapping and
+# nested matches ("thai" in "pad thai", "mala" in "malay") all come back.
+KEYWORD_AUTOMATON = build_keyword_automaton()
+
+
+def scan_keywords(text: str) -> Set[str]:
+    """Return every KEYWORD_TAGS keyword contained in text, in a single pass."""
+    return {kw for _, kw in KEYWORD_AUTOMATON.iter(text)}
+
+
 def infer_cuisine_tags(row: DatasetRow) -> List[str]:
     score: Dict[str, int] = {}
 
-    combined_text_parts = [
-        row.place_name,
-        row.label_name,
-        row.editorial_summary,
-        extract_reviews_text(row.values.get("reviews")),
-    ]
-    text = normalize_text("\n".join(part for part in combined_text_parts if part))
-
     label = canonical_cuisine_name(row.label_name)
     if label in CUISINE_KEYWORDS:
         score[label] = score.get(label, 0) + 4
 
-    for cuisine, keywords in CUISINE_KEYWORDS.items():
-        for kw in keywords:
-            kw_norm = normalize_text(kw)
-            if not kw_norm:
-                continue
-            if kw_norm in text:
-                score[cuisine] = score.get(cuisine, 0) + (2 if " " in kw_norm else 1)
+    for kw in row.keyword_hits:
+        for category, cuisine in KEYWORD_TAGS[kw]:
+            if category == TAG_CATEGORY_CUISINE:
+                score[cuisine] = score.get(cuisine, 0) + (2 if " " in kw else 1)
 
     ranked = sorted(score.items(), key=lambda pair: (-pair[1], pair[0]))
 
@@ -441,25 +621,21 @@ def infer_cuisine_tags(row: DatasetRow) -> List[str]:
 
 
 def infer_allergy_tags(row: DatasetRow) -> List[str]:
-    combined_text_parts = [
-        row.place_name,
-        row.label_name,
-        row.editorial_summary,
-        extract_reviews_text(row.values.get("reviews")),
-    ]
-    text = normalize_text("\n".join(part for part in combined_text_parts if part))
-    matched: List[str] = []
-    for tag_name, keywords in ALLERGY_KEYWORDS.items():
-        for kw in keywords:
-            if normalize_text(kw) in text:
-                matched.append(tag_name)
-                break
-    return matched
+    hits = {
+        tag_name
+        for kw in row.keyword_hits
+        for category, tag_name in KEYWORD_TAGS[kw]
+        if category == TAG_CATEGORY_ALLERGY
+    }
+    return [tag_name for tag_name in ALLERGY_KEYWORDS if tag_name in hits]
+
+
+def needs_reverse_geocode(row: DatasetRow) -> bool:
+    return row.latitude is not None and row.longitude is not None and not row.gmaps_area
 
 
 def infer_area_tag(row: DatasetRow, geocoder: Optional[GoogleReverseGeocoder]) -> str:
-    from_payload = extract_area_from_gmaps_response(row.values.get("gmaps_response"))
-    clean = sanitize_area_candidate(from_payload or "")
+    clean = row.gmaps_area
     if clean:
         return clean
 
@@ -476,9 +652,21 @@ def infer_area_tag(row: DatasetRow, geocoder: Optional[GoogleReverseGeocoder]) -
     return UNKNOWN_AREA_TAG
 
 
+# Text price signals, checked in this precedence: budget, then expensive, then "$$".
+PRICE_TOKEN_TAGS: Dict[str, str] = {
+    **dict.fromkeys(("cheap", "affordable", "budget", "value for money", "wallet-friendly"), PRICE_TAG_BUDGET),
+    **dict.fromkeys(("expensive", "pricey", "premium", "high-end", "fine dining", "$$$"), PRICE_TAG_EXPENSIVE),
+    "$$": PRICE_TAG_MID_RANGE,
+}
+# Lookahead so overlapping tokens are all reported ("$$" inside "$$$").
+PRICE_TOKEN_RE = re.compile(
+    "(?=(" + "|".join(re.escape(t) for t in sorted(PRICE_TOKEN_TAGS, key=len, reverse=True)) + "))"
+)
+
+
 def infer_price_range_tag(row: DatasetRow) -> str:
     # 1) Prefer Google's structured price_level when available.
-    level = extract_price_level_from_gmaps_response(row.values.get("gmaps_response"))
+    level = extract_price_level_from_gmaps_response(row.gmaps_payload)
     if level is not None:
         if level <= 1:
             return PRICE_TAG_BUDGET
@@ -487,24 +675,17 @@ def infer_price_range_tag(row: DatasetRow) -> str:
         return PRICE_TAG_EXPENSIVE
 
     # 2) Fallback: infer from text signals in reviews/metadata.
-    combined = " ".join(
-        [
-            row.place_name,
-            row.label_name,
-            row.editorial_summary,
-            extract_reviews_text(row.values.get("reviews")),
-        ]
-    )
-    text = normalize_text(combined)
+    text = row.normalized_text
 
-    if any(token in text for token in ("cheap", "affordable", "budget", "value for money", "wallet-friendly")):
+    found = {PRICE_TOKEN_TAGS[m.group(1)] for m in PRICE_TOKEN_RE.finditer(text)}
+    if PRICE_TAG_BUDGET in found:
         return PRICE_TAG_BUDGET
-    if any(token in text for token in ("expensive", "pricey", "premium", "high-end", "fine dining", "$$$")):
+    if PRICE_TAG_EXPENSIVE in found:
         return PRICE_TAG_EXPENSIVE
-    if "$$" in text:
+    if PRICE_TAG_MID_RANGE in found:
         return PRICE_TAG_MID_RANGE
 
-    amounts = [float(m.group(1)) for m in PRICE_NUMBER_RE.finditer(combined)]
+    amounts = [float(m.group(1)) for m in PRICE_NUMBER_RE.finditer(row.signal_text)]
     if amounts:
         avg = sum(amounts) / len(amounts)
         if avg <= 15:
@@ -517,37 +698,171 @@ def infer_price_range_tag(row: DatasetRow) -> str:
     return PRICE_TAG_MID_RANGE
 
 
+# Later entries win, so the precedence is budget > cuisine > allergy.
+TAG_CATEGORIES: Dict[str, str] = {
+    **dict.fromkeys(ALLERGY_KEYWORDS, TAG_CATEGORY_ALLERGY),
+    **dict.fromkeys(CUISINE_KEYWORDS, TAG_CATEGORY_CUISINE),
+    **dict.fromkeys((PRICE_TAG_BUDGET, PRICE_TAG_MID_RANGE, PRICE_TAG_EXPENSIVE), TAG_CATEGORY_BUDGET),
+}
+
+
 def infer_tag_category(tag_name: str, area_tag: str) -> Optional[str]:
     if not tag_name:
         return None
-    if tag_name in (PRICE_TAG_BUDGET, PRICE_TAG_MID_RANGE, PRICE_TAG_EXPENSIVE):
-        return TAG_CATEGORY_BUDGET
-    if tag_name in CUISINE_KEYWORDS:
-        return TAG_CATEGORY_CUISINE
-    if tag_name in ALLERGY_KEYWORDS:
-        return TAG_CATEGORY_ALLERGY
+    category = TAG_CATEGORIES.get(tag_name)
+    if category:
+        return category
     if area_tag and tag_name == area_tag:
         return TAG_CATEGORY_AREA
     return None
 
 
-def chunked(values: Sequence[Dict[str, Any]], size: int) -> Iterable[Sequence[Dict[str, Any]]]:
-    for i in range(0, len(values), size):
-        yield values[i : i + size]
+@dataclass(slots=True)
+class ReportRow:
+    """One --report line. Tag list fields are joined with "|" only when the row is written."""
+
+    row_num: int
+    place_name: str
+    matched: bool
+    matched_by: str
+    place_id: str = ""
+    area_tag: str = ""
+    price_range_tag: str = ""
+    cuisine_tags: Sequence[str] = ()
+    allergy_tags: Sequence[str] = ()
+    all_inferred_tags: Sequence[str] = ()
+    new_links_planned_or_inserted: int = 0
+
+    def values(self) -> List[Any]:
+        return [
+            self.row_num,
+            self.place_name,
+            self.matched,
+            self.matched_by,
+            self.place_id,
+            self.area_tag,
+            self.price_range_tag,
+            "|".join(self.cuisine_tags),
+            "|".join(self.allergy_tags),
+            "|".join(self.all_inferred_tags),
+            self.new_links_planned_or_inserted,
+        ]
+
+
+REPORT_FIELDNAMES = tuple(f.name for f in fields(ReportRow))
 
 
-def fetch_all_table_rows(supabase: Client, table: str, select_expr: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+class ReportWriter:
+    """Write report rows as they are produced: .csv, .xlsx, or JSON for any other suffix.
+
+    A trailing .gz (e.g. report.csv.gz) gzips CSV and JSON output at compresslevel=1.
+    """
+
+    def __init__(self, path: Path, fieldnames: Sequence[str]) -> None:
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.suffix = path.suffix.lower()
+        self.gzip = self.suffix == ".gz"
+        if self.gzip:
+            self.suffix = path.with_suffix("").suffix.lower()
+        self.rows_written = 0
+        if self.suffix == ".csv":
+            if self.gzip:
+                self.file = gzip.open(path, "wt", compresslevel=1, newline="", encoding="utf-8")
+            else:
+                self.file = path.open("w", newline="", encoding="utf-8")
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(self.fieldnames)
+        elif self.suffix == ".xlsx":
+            if self.gzip:
+                raise ValueError(".xlsx reports are already compressed; drop the .gz suffix")
+            try:
+                from openpyxl import Workbook
+            except Exception as exc:
+                raise RuntimeError("openpyxl is required to write .xlsx reports") from exc
+
+            # Write-only mode streams rows to disk instead of keeping every cell in memory.
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet("auto_tag_report")
+            self.sheet.append(self.fieldnames)
+        else:
+            self.file = gzip.open(path, "wb", compresslevel=1) if self.gzip else path.open("wb")
+            self.file.write(b"[")
+
+    def write(self, values: Sequence[Any]) -> None:
+        if self.suffix == ".csv":
+            self.csv_writer.writerow(values)
+        elif self.suffix == ".xlsx":
+            self.sheet.append(values)
+        else:
+            # Same layout json.dump(rows, indent=2) produces for the whole list.
+            row_json = orjson.dumps(dict(zip(self.fieldnames, values)), option=orjson.OPT_INDENT_2)
+            self.file.write((b"," if self.rows_written else b"") + b"\n  " + row_json.replace(b"\n", b"\n  "))
+        self.rows_written += 1
+
+    def close(self) -> None:
+        if self.suffix == ".xlsx":
+            self.workbook.save(self.path)
+            return
+        if self.suffix != ".csv":
+            self.file.write(b"\n]" if self.rows_written else b"]")
+        self.file.close()
+
+
+def chunked(values: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    # Works on any iterable, so callers can stream rows without building the full list first.
+    iterator = iter(values)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def fetch_table_page(
+    supabase: Client,
+    table: str,
+    select_expr: str,
+    order_by: Sequence[str],
+    offset: int,
+    page_size: int,
+) -> List[Dict[str, Any]]:
+    query = supabase.table(table).select(select_expr)
+    # Without a total order Postgres may return rows in a different order per request,
+    # so separately fetched pages could overlap or skip rows.
+    for col in order_by:
+        query = query.order(col)
+    response = query.range(offset, offset + page_size - 1).execute()
+    return response.data or []
+
+
+def fetch_all_table_rows(
+    supabase: Client,
+    table: str,
+    select_expr: str,
+    order_by: Sequence[str],
+    page_size: int = 1000,
+    max_workers: int = 8,
+) -> List[Dict[str, Any]]:
+    # Count first so every page can be requested at once instead of one round-trip after another.
+    total = supabase.table(table).select(select_expr, count="exact", head=True).execute().count
     all_rows: List[Dict[str, Any]] = []
     offset = 0
+    if total:
+        offsets = range(0, total, page_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = executor.map(
+                lambda start: fetch_table_page(supabase, table, select_expr, order_by, start, page_size), offsets
+            )
+            for rows in pages:
+                all_rows.extend(rows)
+        offset = len(offsets) * page_size
+        if len(all_rows) < offset:
+            return all_rows
 
+    # No count, or rows were added after counting: page sequentially from there.
     while True:
-        response = (
-            supabase.table(table)
-            .select(select_expr)
-            .range(offset, offset + page_size - 1)
-            .execute()
-        )
-        rows = response.data or []
+        rows = fetch_table_page(supabase, table, select_expr, order_by, offset, page_size)
         all_rows.extend(rows)
         if len(rows) < page_size:
             break
@@ -556,6 +871,27 @@ def fetch_all_table_rows(supabase: Client, table: str, select_expr: str, page_si
     return all_rows
 
 
+def insert_place_tags(supabase: Client, rows: List[Dict[str, Any]]) -> int:
+    """Insert links, halving failed batches so one bad row only costs its own insert.
+
+    Returns the number of rows that could not be inserted.
+    """
+    try:
+        supabase.table("place_tags").insert(rows).execute()
+        return 0
+    except Exception:
+        pass
+    try:
+        # Usually a duplicate link in the batch; skip those and keep the rest.
+        supabase.table("place_tags").upsert(rows, on_conflict="place_id,tag_id", ignore_duplicates=True).execute()
+        return 0
+    except Exception:
+        if len(rows) == 1:
+            return 1
+    mid = len(rows) // 2
+    return insert_place_tags(supabase, rows[:mid]) + insert_place_tags(supabase, rows[mid:])
+
+
 def pick_tags_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     candidates = [
         "id, name, category",
@@ -564,7 +900,7 @@ def pick_tags_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     last_error: Optional[Exception] = None
     for select_expr in candidates:
         try:
-            rows = fetch_all_table_rows(supabase, "tags", select_expr)
+            rows = fetch_all_table_rows(supabase, "tags", select_expr, order_by=("id",))
             return select_expr, rows
         except Exception as exc:
             last_error = exc
@@ -590,33 +926,52 @@ def find_tag_by_name(supabase: Client, tag_name: str) -> Optional[Dict[str, Any]
 
 
 def read_csv_rows(path: Path) -> Tuple[List[str], List[Dict[str, Any]]]:
-    with path.open("r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = list(reader.fieldnames or [])
-        rows = [dict(row) for row in reader]
+    # Plain csv.reader + zip builds one dict per row; DictReader builds one and we copied it.
+    with path.open("r", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        reader = csv.reader(f)
+        fieldnames = next(reader, [])
+        rows = [dict(zip(fieldnames, values)) for values in reader if values]
     return fieldnames, rows
 
 
 def write_csv_rows(path: Path, fieldnames: Sequence[str], rows: Sequence[Dict[str, Any]]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=list(fieldnames))
-        writer.writeheader()
-        writer.writerows(rows)
+    with path.open("w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows([row.get(name, "") for name in fieldnames] for row in rows)
 
 
-def load_dataset_rows(dataset_path: Path, sheet_name: str) -> Tuple[List[str], List[DatasetRow]]:
+def calamine_cell(value: Any) -> Any:
+    # Match openpyxl's values: empty cells as None, whole numbers as int.
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_sheet_values(dataset_path: Path, sheet_name: str) -> Iterable[Sequence[Any]]:
+    if CalamineWorkbook is not None:
+        wb = CalamineWorkbook.from_path(str(dataset_path))
+        if sheet_name not in wb.sheet_names:
+            raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {wb.sheet_names}")
+        data = wb.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+        return ([calamine_cell(v) for v in values] for values in data)
+
     wb = load_workbook(dataset_path, read_only=True, data_only=True)
     if sheet_name not in wb.sheetnames:
         raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {wb.sheetnames}")
+    return wb[sheet_name].iter_rows(values_only=True)
+
 
-    ws = wb[sheet_name]
-    iterator = ws.iter_rows(values_only=True)
+def load_dataset_rows(dataset_path: Path, sheet_name: str) -> Tuple[List[str], List[DatasetRow]]:
+    iterator = iter(iter_sheet_values(dataset_path, sheet_name))
     headers = [str(h).strip() if h is not None else "" for h in next(iterator)]
 
     rows: List[DatasetRow] = []
     for row_num, values in enumerate(iterator, start=1):
-        row_dict = {headers[i]: values[i] for i in range(min(len(headers), len(values)))}
+        row_dict = dict(zip(headers, values))
         rows.append(DatasetRow(row_num=row_num, values=row_dict))
 
     return headers, rows
@@ -632,7 +987,7 @@ def pick_place_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     last_error: Optional[Exception] = None
     for select_expr in candidates:
         try:
-            rows = fetch_all_table_rows(supabase, "places", select_expr)
+            rows = fetch_all_table_rows(supabase, "places", select_expr, order_by=("id",))
             return select_expr, rows
         except Exception as exc:
             last_error = exc
@@ -665,6 +1020,11 @@ def main() -> None:
         action="store_true",
         help="Use Google reverse geocoding for area when fallback is needed",
     )
+    parser.add_argument(
+        "--geocode-cache",
+        default=str(Path(__file__).resolve().parent / ".geocode_cache.sqlite"),
+        help="SQLite file caching reverse-geocoded areas across runs ('' to disable)",
+    )
     parser.add_argument(
         "--limit",
         type=int,
@@ -674,7 +1034,7 @@ def main() -> None:
     parser.add_argument(
         "--report",
         default="",
-        help="Optional report output path (.csv, .json, or .xlsx). Example: ./tagging_report.xlsx",
+        help="Optional report output path (.csv, .json, or .xlsx; add .gz to gzip csv/json). Example: ./tagging_report.xlsx",
     )
     parser.add_argument("--places-csv", default="", help="Path to exported places.csv")
     parser.add_argument("--tags-csv", default="", help="Path to exported tags.csv")
@@ -689,6 +1049,11 @@ def main() -> None:
         default="",
         help="Output CSV path for updated place_tags table (CSV mode)",
     )
+    parser.add_argument(
+        "--sort-output",
+        action="store_true",
+        help="Sort the generated place_tags CSV by (place_id, tag_id) for diff-friendly output (CSV mode)",
+    )
     args = parser.parse_args()
 
     load_dotenv()
@@ -705,7 +1070,10 @@ def main() -> None:
     if args.use_google_geocode:
         maps_key = os.environ.get("GOOGLE_PLACES_API_KEY") or os.environ.get("GOOGLE_MAPS_API_KEY")
         if maps_key:
-            geocoder = GoogleReverseGeocoder(api_key=maps_key)
+            geocoder = GoogleReverseGeocoder(
+                api_key=maps_key,
+                cache_path=Path(args.geocode_cache) if args.geocode_cache else None,
+            )
         else:
             print("[warn] --use-google-geocode set but no GOOGLE_MAPS_API_KEY/GOOGLE_API_KEY found; skipping reverse geocode")
 
@@ -755,7 +1123,7 @@ def main() -> None:
         assert supabase is not None
         place_select, place_rows = pick_place_query(supabase)
         tags_select, tags_rows = pick_tags_query(supabase)
-        place_tag_rows = fetch_all_table_rows(supabase, "place_tags", "place_id, tag_id")
+        place_tag_rows = fetch_all_table_rows(supabase, "place_tags", "place_id, tag_id", order_by=("place_id", "tag_id"))
         tags_fieldnames = ["id", "name"]
         if tags_select and "category" in tags_select:
             tags_fieldnames.append("category")
@@ -773,38 +1141,51 @@ def main() -> None:
         normalize_text(t.get("name")): t for t in tags_rows if t.get("name") is not None
     }
     tags_has_category = "category" in tags_fieldnames
-    existing_pairs: Set[Tuple[str, str]] = {
-        (str(r.get("place_id")), str(r.get("tag_id")))
-        for r in place_tag_rows
-        if r.get("place_id") is not None and r.get("tag_id") is not None
-    }
-
-    place_by_id = {str(p.get("id")): p for p in place_rows if p.get("id") is not None}
-    place_by_gmaps_place_id = {
-        normalize_text(p.get("gmaps_place_id")): p
-        for p in place_rows
-        if p.get("gmaps_place_id")
-    }
-    place_by_gmaps_uri = {
-        normalize_text(p.get("gmaps_uri")): p
-        for p in place_rows
-        if p.get("gmaps_uri")
-    }
-    place_by_name_address = {
-        f"{normalize_text(p.get('name'))}||{normalize_text(p.get('address'))}": p
-        for p in place_rows
-    }
+    # place_id -> tag_ids already linked (existing rows plus links queued this run).
+    place_tag_ids: DefaultDict[str, Set[str]] = defaultdict(set)
+    for r in place_tag_rows:
+        if r.get("place_id") is not None and r.get("tag_id") is not None:
+            place_tag_ids[str(r.get("place_id"))].add(str(r.get("tag_id")))
+
+    place_by_id: Dict[str, Dict[str, Any]] = {}
+    place_by_gmaps_place_id: Dict[str, Dict[str, Any]] = {}
+    place_by_gmaps_uri: Dict[str, Dict[str, Any]] = {}
+    place_by_name_address: Dict[str, Dict[str, Any]] = {}
+    for p in place_rows:
+        if p.get("id") is not None:
+            place_by_id[str(p["id"])] = p
+        if p.get("gmaps_place_id"):
+            place_by_gmaps_place_id[normalize_row_text(p["gmaps_place_id"])] = p
+        if p.get("gmaps_uri"):
+            place_by_gmaps_uri[normalize_row_text(p["gmaps_uri"])] = p
+        place_by_name_address[f"{normalize_row_text(p.get('name'))}||{normalize_row_text(p.get('address'))}"] = p
 
     created_tags = 0
     planned_links = 0
+    inserted_links = 0
     failed_link_inserts = 0
     failed_tag_ensures = 0
     unmatched_rows = 0
     rows_with_no_tags = 0
-    place_tags_to_insert: List[Dict[str, Any]] = []
+    rows_without_text = 0
+    # (place_id, tag_id) pairs; turned into row dicts only when sent to Supabase.
+    place_tags_to_insert: List[Tuple[str, str]] = []
+    pending_tags: List[Dict[str, Any]] = []
     merged_tags_rows: List[Dict[str, Any]] = [dict(r) for r in tags_rows]
     merged_place_tags_rows: List[Dict[str, Any]] = [dict(r) for r in place_tag_rows]
-    report_rows: List[Dict[str, Any]] = []
+    # CSV mode only exports links to English tags. Existing links are filtered once here and
+    # new ones as they are queued, so the generated file needs no second pass. None = no filter.
+    exported_tag_ids: Optional[Set[str]] = None
+    if csv_mode and (not tags_fieldnames or "id" in tags_fieldnames):
+        exported_tag_ids = {str(t.get("id")) for t in tags_rows if is_english_tag(str(t.get("name", "")))}
+        merged_place_tags_rows = [r for r in merged_place_tags_rows if str(r.get("tag_id")) in exported_tag_ids]
+    # Exact tag name -> id, filled as names are resolved, so repeats skip ensure_tag_id.
+    tag_ids_by_name: Dict[str, str] = {}
+    report: Optional[ReportWriter] = None
+
+    def add_report_row(row: ReportRow) -> None:
+        if report is not None:
+            report.write(row.values())
 
     synthetic_tag_id = -1
     max_tag_id = 0
@@ -834,45 +1215,78 @@ def main() -> None:
             tags_by_norm[key] = new_tag
             created_tags += 1
             merged_tags_rows.append(new_tag)
+            if exported_tag_ids is not None:
+                exported_tag_ids.add(new_tag["id"])
             return str(new_tag["id"])
 
-        if not args.apply:
-            synthetic = {"id": str(synthetic_tag_id), "name": clean_name}
-            if tags_has_category and category:
-                synthetic["category"] = category
-            synthetic_tag_id -= 1
-            tags_by_norm[key] = synthetic
+        synthetic = {"id": str(synthetic_tag_id), "name": clean_name}
+        if tags_has_category and category:
+            synthetic["category"] = category
+        synthetic_tag_id -= 1
+        tags_by_norm[key] = synthetic
+        if args.apply:
+            # Inserted in bulk by flush_pending_tags() before the links are written;
+            # until then the negative id is a placeholder.
+            pending_tags.append(synthetic)
+        else:
             created_tags += 1
-            return str(synthetic["id"])
+        return str(synthetic["id"])
 
-        insert_payload = {"name": clean_name}
-        if tags_has_category and category:
-            insert_payload["category"] = category
+    def upsert_tags(payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Needs the unique index on tags(name) from supabase_functions.sql. Existing
+        # names come back with their id, so no follow-up lookup is needed.
+        assert supabase is not None
+        response = (
+            supabase.table("tags")
+            .upsert(payload, on_conflict="name", returning="representation")
+            .execute()
+        )
+        return [r for r in (response.data or []) if r.get("id") is not None]
+
+    def insert_tag(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Per-tag fallback, e.g. when tags(name) has no unique index for the upsert.
+        assert supabase is not None
         insert_error: Optional[Exception] = None
         try:
-            assert supabase is not None
-            response = supabase.table("tags").insert(insert_payload).execute()
+            response = supabase.table("tags").insert(payload).execute()
             inserted = (response.data or [None])[0]
             if inserted and inserted.get("id") is not None:
-                tags_by_norm[key] = inserted
-                created_tags += 1
-                return str(inserted["id"])
+                return inserted
         except Exception as exc:
             insert_error = exc
 
-        # Insert may return no representation or fail on duplicate; lookup by name robustly.
-        assert supabase is not None
-        inserted = find_tag_by_name(supabase, clean_name)
-        if not inserted or inserted.get("id") is None:
-            failed_tag_ensures += 1
-            if insert_error is not None:
-                print(f"[warn] Could not ensure tag '{clean_name}' ({insert_error})")
-            else:
-                print(f"[warn] Could not ensure tag '{clean_name}'")
-            return None
+        found = find_tag_by_name(supabase, payload["name"])
+        if found and found.get("id") is not None:
+            return found
+        if insert_error is not None:
+            print(f"[warn] Could not ensure tag '{payload['name']}' ({insert_error})")
+        else:
+            print(f"[warn] Could not ensure tag '{payload['name']}'")
+        return None
 
-        tags_by_norm[key] = inserted
-        return str(inserted["id"])
+    def flush_pending_tags() -> Dict[str, str]:
+        """Upsert queued tags in batches; return placeholder id -> real id."""
+        nonlocal created_tags, failed_tag_ensures
+        real_ids: Dict[str, str] = {}
+        for batch in chunked(pending_tags, 500):
+            payload = [{k: v for k, v in t.items() if k != "id"} for t in batch]
+            try:
+                upserted_rows = upsert_tags(payload)
+            except Exception as exc:
+                print(f"[warn] Bulk tag upsert failed, inserting per tag ({exc})")
+                upserted_rows = [row for row in map(insert_tag, payload) if row]
+
+            upserted_by_norm = {normalize_text(r.get("name")): r for r in upserted_rows}
+            for placeholder in batch:
+                key = normalize_text(placeholder["name"])
+                upserted = upserted_by_norm.get(key)
+                if not upserted:
+                    failed_tag_ensures += 1
+                    continue
+                created_tags += 1
+                tags_by_norm[key] = upserted
+                real_ids[str(placeholder["id"])] = str(upserted["id"])
+        return real_ids
 
     def match_place_id(row: DatasetRow) -> Tuple[Optional[str], str]:
         raw_id = row.values.get("id")
@@ -882,16 +1296,16 @@ def main() -> None:
                 return str(by_id["id"]), "id"
 
         if row.gmaps_place_id:
-            by_pid = place_by_gmaps_place_id.get(normalize_text(row.gmaps_place_id))
+            by_pid = place_by_gmaps_place_id.get(normalize_row_text(row.gmaps_place_id))
             if by_pid:
                 return str(by_pid["id"]), "gmaps_place_id"
 
         if row.gmaps_uri:
-            by_uri = place_by_gmaps_uri.get(normalize_text(row.gmaps_uri))
+            by_uri = place_by_gmaps_uri.get(normalize_row_text(row.gmaps_uri))
             if by_uri:
                 return str(by_uri["id"]), "gmaps_uri"
 
-        key = f"{normalize_text(row.place_name)}||{normalize_text(row.formatted_address)}"
+        key = f"{normalize_row_text(row.place_name)}||{normalize_row_text(row.formatted_address)}"
         by_name_addr = place_by_name_address.get(key)
         if by_name_addr:
             return str(by_name_addr["id"]), "name+address"
@@ -899,97 +1313,110 @@ def main() -> None:
         return None, "none"
 
     def process_row(row: DatasetRow, place_id: str, matched_by: str) -> None:
-        nonlocal rows_with_no_tags, planned_links
+        nonlocal rows_with_no_tags, rows_without_text, planned_links
 
         area_tag = infer_area_tag(row, geocoder)
         price_tag = infer_price_range_tag(row)
-        cuisine_tags = infer_cuisine_tags(row)
-        allergy_tags = infer_allergy_tags(row)
+        if row.signal_text:
+            cuisine_tags = infer_cuisine_tags(row)
+            allergy_tags = infer_allergy_tags(row)
+        else:
+            # No name/label/summary/reviews: nothing for the keyword scans to find.
+            rows_without_text += 1
+            cuisine_tags, allergy_tags = [], []
 
         proposed = [t for t in [area_tag, price_tag, *cuisine_tags, *allergy_tags] if t and is_english_tag(t)]
-        # Preserve order, remove duplicates case-insensitively.
-        seen_norm: Set[str] = set()
-        deduped: List[str] = []
-        for t in proposed:
-            key = normalize_text(t)
-            if key in seen_norm:
-                continue
-            seen_norm.add(key)
-            deduped.append(t)
+        # Preserve order, remove duplicates case-insensitively (first spelling wins).
+        first_spelling = {normalize_text(t): t for t in reversed(proposed)}
+        deduped = [first_spelling[key] for key in dict.fromkeys(map(normalize_text, proposed))]
 
         if not deduped:
             rows_with_no_tags += 1
-            report_rows.append(
-                {
-                    "row_num": row.row_num,
-                    "place_name": row.place_name,
-                    "matched": True,
-                    "matched_by": matched_by,
-                    "place_id": place_id,
-                    "area_tag": area_tag or "",
-                    "price_range_tag": price_tag,
-                    "cuisine_tags": "|".join(cuisine_tags),
-                    "allergy_tags": "|".join(allergy_tags),
-                    "all_inferred_tags": "",
-                    "new_links_planned_or_inserted": 0,
-                }
+            add_report_row(
+                ReportRow(
+                    row_num=row.row_num,
+                    place_name=row.place_name,
+                    matched=True,
+                    matched_by=matched_by,
+                    place_id=place_id,
+                    area_tag=area_tag or "",
+                    price_range_tag=price_tag,
+                    cuisine_tags=cuisine_tags,
+                    allergy_tags=allergy_tags,
+                )
             )
             return
 
         row_links = 0
+        linked = place_tag_ids[place_id]
         for tag_name in deduped:
-            category = infer_tag_category(tag_name, area_tag)
-            tag_id = ensure_tag_id(tag_name, category)
-            if not tag_id:
-                continue
-
-            pair = (place_id, tag_id)
-            if pair in existing_pairs:
+            tag_id = tag_ids_by_name.get(tag_name)
+            if tag_id is None:
+                # First sighting of this name: resolve (or queue) it once; the category
+                # only matters when the tag has to be created.
+                tag_id = ensure_tag_id(tag_name, infer_tag_category(tag_name, area_tag))
+                if not tag_id:
+                    continue
+                tag_ids_by_name[tag_name] = tag_id
+
+            if tag_id in linked:
                 continue
 
-            existing_pairs.add(pair)
+            linked.add(tag_id)
             planned_links += 1
             row_links += 1
-            new_link = {"place_id": place_id, "tag_id": tag_id}
-            place_tags_to_insert.append(new_link)
-            if csv_mode:
-                merged_place_tags_rows.append(new_link)
-
-        report_rows.append(
-            {
-                "row_num": row.row_num,
-                "place_name": row.place_name,
-                "matched": True,
-                "matched_by": matched_by,
-                "place_id": place_id,
-                "area_tag": area_tag or "",
-                "price_range_tag": price_tag,
-                "cuisine_tags": "|".join(cuisine_tags),
-                "allergy_tags": "|".join(allergy_tags),
-                "all_inferred_tags": "|".join(deduped),
-                "new_links_planned_or_inserted": row_links,
-            }
+            place_tags_to_insert.append((place_id, tag_id))
+            if csv_mode and (exported_tag_ids is None or tag_id in exported_tag_ids):
+                merged_place_tags_rows.append({"place_id": place_id, "tag_id": tag_id})
+
+        add_report_row(
+            ReportRow(
+                row_num=row.row_num,
+                place_name=row.place_name,
+                matched=True,
+                matched_by=matched_by,
+                place_id=place_id,
+                area_tag=area_tag or "",
+                price_range_tag=price_tag,
+                cuisine_tags=cuisine_tags,
+                allergy_tags=allergy_tags,
+                all_inferred_tags=deduped,
+                new_links_planned_or_inserted=row_links,
+            )
         )
 
+    # Rows are written as they are processed rather than collected until the end.
+    report_path: Optional[Path] = None
+    if args.report:
+        report_path = Path(args.report).expanduser()
+        if not report_path.is_absolute():
+            report_path = Path.cwd() / report_path
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report = ReportWriter(report_path, REPORT_FIELDNAMES)
+
+    # Match every dataset row once; the geocode prefetch and the tagging loop both use it.
+    dataset_matches: List[Tuple[DatasetRow, Optional[str], str]] = []
     if args.source == "dataset":
-        for row in dataset_rows:
-            place_id, matched_by = match_place_id(row)
+        dataset_matches = [(row, *match_place_id(row)) for row in dataset_rows]
+
+    if geocoder:
+        # Geocode every row that will need it up front, in parallel, instead of one
+        # blocking request per row inside process_row.
+        if args.source == "dataset":
+            rows_to_tag = [row for row, place_id, _ in dataset_matches if place_id]
+        else:
+            rows_to_tag = [
+                PlaceRow(row_num=idx, values=place)
+                for idx, place in enumerate(place_rows, start=1)
+                if place.get("id")
+            ]
+        geocoder.prefetch((row.latitude, row.longitude) for row in rows_to_tag if needs_reverse_geocode(row))
+
+    if args.source == "dataset":
+        for row, place_id, matched_by in dataset_matches:
             if not place_id:
                 unmatched_rows += 1
-                report_rows.append(
-                    {
-                        "row_num": row.row_num,
-                        "place_name": row.place_name,
-                        "matched": False,
-                        "matched_by": matched_by,
-                        "place_id": "",
-                        "area_tag": "",
-                        "cuisine_tags": "",
-                        "allergy_tags": "",
-                        "all_inferred_tags": "",
-                        "new_links_planned_or_inserted": 0,
-                    }
-                )
+                add_report_row(ReportRow(row_num=row.row_num, place_name=row.place_name, matched=False, matched_by=matched_by))
                 continue
             process_row(row, place_id, matched_by)
     else:
@@ -997,36 +1424,80 @@ def main() -> None:
             place_id = str(place.get("id") or "")
             if not place_id:
                 unmatched_rows += 1
-                report_rows.append(
-                    {
-                        "row_num": idx,
-                        "place_name": str(place.get("name") or ""),
-                        "matched": False,
-                        "matched_by": "places",
-                        "place_id": "",
-                        "area_tag": "",
-                        "cuisine_tags": "",
-                        "allergy_tags": "",
-                        "all_inferred_tags": "",
-                        "new_links_planned_or_inserted": 0,
-                    }
+                add_report_row(
+                    ReportRow(row_num=idx, place_name=str(place.get("name") or ""), matched=False, matched_by="places")
                 )
                 continue
             row = PlaceRow(row_num=idx, values=place)
             process_row(row, place_id, "places")
 
-    if not csv_mode and args.apply and place_tags_to_insert:
+    if geocoder:
+        geocoder.close()
+    if report is not None:
+        report.close()
+
+    def apply_links_via_rpc() -> bool:
+        """Create new tags and links server-side, one transaction per chunk.
+
+        Returns False when the auto_tag_apply function is not installed, so the
+        caller can fall back to table inserts.
+        """
+        nonlocal created_tags, inserted_links, failed_link_inserts
         assert supabase is not None
-        for batch in chunked(place_tags_to_insert, 250):
+        tags_by_id = {str(t["id"]): t for t in tags_by_norm.values()}
+        payload = (
+            {
+                "place_id": place_id,
+                "tag_name": tags_by_id[tag_id]["name"],
+                "category": tags_by_id[tag_id].get("category"),
+            }
+            for place_id, tag_id in place_tags_to_insert
+        )
+        for batch_num, batch in enumerate(chunked(payload, 2000)):
             try:
-                supabase.table("place_tags").insert(list(batch)).execute()
-            except Exception:
-                # Retry row-by-row so one bad row doesn't stop everything.
-                for row in batch:
-                    try:
-                        supabase.table("place_tags").insert(row).execute()
-                    except Exception:
-                        failed_link_inserts += 1
+                response = supabase.rpc("auto_tag_apply", {"rows": batch}).execute()
+            except Exception as exc:
+                if batch_num == 0:
+                    print(f"[warn] auto_tag_apply RPC unavailable, using table inserts ({exc})")
+                    return False
+                print(f"[warn] auto_tag_apply failed for a batch of {len(batch)} links ({exc})")
+                failed_link_inserts += len(batch)
+                continue
+            counts = (response.data or [{}])[0]
+            created_tags += int(counts.get("new_tags") or 0)
+            inserted_links += int(counts.get("new_links") or 0)
+        return True
+
+    applied_via_rpc = False
+    if not csv_mode and args.apply and place_tags_to_insert and tags_has_category:
+        applied_via_rpc = apply_links_via_rpc()
+
+    if not csv_mode and args.apply and pending_tags and not applied_via_rpc:
+        real_ids = flush_pending_tags()
+        placeholder_ids = {str(t["id"]) for t in pending_tags}
+        resolved_links: List[Tuple[str, str]] = []
+        for place_id, tag_id in place_tags_to_insert:
+            if tag_id in placeholder_ids:
+                tag_id = real_ids.get(tag_id)
+                # Tag could not be created, or it resolved to a link that already exists.
+                linked = place_tag_ids[place_id]
+                if tag_id is None or tag_id in linked:
+                    planned_links -= 1
+                    continue
+                linked.add(tag_id)
+            resolved_links.append((place_id, tag_id))
+        place_tags_to_insert = resolved_links
+
+    if not csv_mode and args.apply and place_tags_to_insert and not applied_via_rpc:
+        assert supabase is not None
+        # Batches are independent, so post several at once; the client shares one HTTP pool.
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            failed_link_inserts += sum(
+                executor.map(
+                    lambda batch: insert_place_tags(supabase, [{"place_id": p, "tag_id": t} for p, t in batch]),
+                    chunked(place_tags_to_insert, 5000),
+                )
+            )
 
     print("\nSummary")
     print(f"- Existing tags loaded: {len(tags_rows)}")
@@ -1034,12 +1505,16 @@ def main() -> None:
     print(f"- New tags {'created' if (args.apply or csv_mode) else 'planned'}: {created_tags}")
     if args.apply and not csv_mode:
         print(f"- Failed tag ensure operations: {failed_tag_ensures}")
-    print(f"- New place_tags {'inserted' if (args.apply or csv_mode) else 'planned'}: {planned_links}")
+    links_done = (args.apply or csv_mode) and not applied_via_rpc
+    print(f"- New place_tags {'inserted' if links_done else 'planned'}: {planned_links}")
+    if applied_via_rpc:
+        print(f"- New place_tags inserted: {inserted_links}")
     if args.apply and not csv_mode:
         print(f"- Failed place_tags inserts: {failed_link_inserts}")
     unmatched_label = "Unmatched dataset rows" if args.source == "dataset" else "Rows missing place_id"
     print(f"- {unmatched_label}: {unmatched_rows}")
     print(f"- Rows with no inferred tags: {rows_with_no_tags}")
+    print(f"- Rows without text (cuisine/allergy skipped): {rows_without_text}")
 
     if csv_mode:
         out_tags_csv = Path(args.out_tags_csv).expanduser() if args.out_tags_csv else Path.cwd() / "tags.generated.csv"
@@ -1057,11 +1532,10 @@ def main() -> None:
             place_tags_fieldnames = ["place_id", "tag_id"]
 
         if "id" in tags_fieldnames:
+            # Links to non-English tags were already left out of merged_place_tags_rows.
             merged_tags_rows = [r for r in merged_tags_rows if is_english_tag(str(r.get("name", "")))]
             merged_tags_rows.sort(key=lambda r: int(str(r.get("id"))))
-            valid_tag_ids = {str(r.get("id")) for r in merged_tags_rows}
-            merged_place_tags_rows = [r for r in merged_place_tags_rows if str(r.get("tag_id")) in valid_tag_ids]
-        if "place_id" in place_tags_fieldnames and "tag_id" in place_tags_fieldnames:
+        if args.sort_output and "place_id" in place_tags_fieldnames and "tag_id" in place_tags_fieldnames:
             merged_place_tags_rows.sort(key=lambda r: (int(str(r.get("place_id"))), int(str(r.get("tag_id")))))
 
         write_csv_rows(out_tags_csv, tags_fieldnames, merged_tags_rows)
@@ -1069,47 +1543,7 @@ def main() -> None:
         print(f"- Updated tags CSV written: {out_tags_csv}")
         print(f"- Updated place_tags CSV written: {out_place_tags_csv}")
 
-    if args.report:
-        report_path = Path(args.report).expanduser()
-        if not report_path.is_absolute():
-            report_path = Path.cwd() / report_path
-        report_path.parent.mkdir(parents=True, exist_ok=True)
-
-        fieldnames = [
-            "row_num",
-            "place_name",
-            "matched",
-            "matched_by",
-            "place_id",
-            "area_tag",
-            "price_range_tag",
-            "cuisine_tags",
-            "allergy_tags",
-            "all_inferred_tags",
-            "new_links_planned_or_inserted",
-        ]
-        if report_path.suffix.lower() == ".csv":
-            with report_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(report_rows)
-        elif report_path.suffix.lower() == ".xlsx":
-            try:
-                from openpyxl import Workbook
-            except Exception as exc:
-                raise RuntimeError("openpyxl is required to write .xlsx reports") from exc
-
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "auto_tag_report"
-            ws.append(fieldnames)
-            for row in report_rows:
-                ws.append([row.get(name, "") for name in fieldnames])
-            wb.save(report_path)
-        else:
-            with report_path.open("w", encoding="utf-8") as f:
-                json.dump(report_rows, f, ensure_ascii=False, indent=2)
-
+    if report_path is not None:
         print(f"- Report written: {report_path}")
 
 
@@ -16,10 +16,18 @@ import argparse
 import json
 import os
 import re
+import sqlite3
+import threading
 import time
 import urllib.parse
-import urllib.request
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import ahocorasick
+import httpx
 
 try:
     from dotenv import load_dotenv
@@ -225,13 +233,18 @@ def to_float(value: Any) -> Optional[float]:
         return None
 
 
+CUISINE_CANONICAL_KEYS: Dict[str, str] = {normalize_text(cuisine): cuisine for cuisine in CUISINE_KEYWORDS}
+
+
 def canonical_cuisine_name(name: str) -> str:
     key = normalize_text(name)
     if key in CUISINE_ALIASES:
         return CUISINE_ALIASES[key]
-    for cuisine in CUISINE_KEYWORDS:
-        if normalize_text(cuisine) == key:
-            return cuisine
+
+    cuisine = CUISINE_CANONICAL_KEYS.get(key)
+    if cuisine is not None:
+        return cuisine
+
     return name.strip()
 
 
@@ -253,21 +266,49 @@ def extract_reviews_text(raw_reviews: Any) -> str:
     return "\n".join(texts)
 
 
-def infer_cuisine_tags(text: str, label_name: str = "") -> List[str]:
+def build_keyword_index() -> Dict[str, List[Tuple[str, str]]]:
+    index: Dict[str, List[Tuple[str, str]]] = {}
+    for category, catalog in ((TAG_CATEGORY_CUISINE, CUISINE_KEYWORDS), (TAG_CATEGORY_ALLERGY, ALLERGY_KEYWORDS)):
+        for tag_name, keywords in catalog.items():
+            for kw in keywords:
+                kw_norm = normalize_text(kw)
+                if kw_norm:
+                    index.setdefault(kw_norm, []).append((category, tag_name))
+    return index
+
+
+# Normalized keyword -> every (category, tag) it votes for ("brunch" is both Western and Cafe).
+KEYWORD_TAGS = build_keyword_index()
+
+def build_keyword_automaton() -> Any:
+    automaton = ahocorasick.Automaton()
+    for kw in KEYWORD_TAGS:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+# Reports every keyword ending at each position in one pass, so overlapping and
+# nested matches ("thai" in "pad thai", "mala" in "malay") all come back.
+KEYWORD_AUTOMATON = build_keyword_automaton()
+
+
+def scan_keywords(text: str) -> Set[str]:
+    """Return every KEYWORD_TAGS keyword contained in text once normalized, in a single pass."""
+    return {kw for _, kw in KEYWORD_AUTOMATON.iter(normalize_text(text))}
+
+
+def infer_cuisine_tags(keyword_hits: Set[str], label_name: str = "") -> List[str]:
     score: Dict[str, int] = {}
-    norm_text = normalize_text(text)
 
     label = canonical_cuisine_name(label_name)
     if label in CUISINE_KEYWORDS:
         score[label] = score.get(label, 0) + 4
 
-    for cuisine, keywords in CUISINE_KEYWORDS.items():
-        for kw in keywords:
-            kw_norm = normalize_text(kw)
-            if not kw_norm:
-                continue
-            if kw_norm in norm_text:
-                score[cuisine] = score.get(cuisine, 0) + (2 if " " in kw_norm else 1)
+    for kw in keyword_hits:
+        for category, cuisine in KEYWORD_TAGS[kw]:
+            if category == TAG_CATEGORY_CUISINE:
+                score[cuisine] = score.get(cuisine, 0) + (2 if " " in kw else 1)
 
     ranked = sorted(score.items(), key=lambda pair: (-pair[1], pair[0]))
     selected: List[str] = []
@@ -311,15 +352,14 @@ def infer_cuisine_tags_from_types(types: Sequence[str]) -> List[str]:
     return deduped
 
 
-def infer_allergy_tags(text: str) -> List[str]:
-    norm_text = normalize_text(text)
-    matched: List[str] = []
-    for tag_name, keywords in ALLERGY_KEYWORDS.items():
-        for kw in keywords:
-            if normalize_text(kw) in norm_text:
-                matched.append(tag_name)
-                break
-    return matched
+def infer_allergy_tags(keyword_hits: Set[str]) -> List[str]:
+    hits = {
+        tag_name
+        for kw in keyword_hits
+        for category, tag_name in KEYWORD_TAGS[kw]
+        if category == TAG_CATEGORY_ALLERGY
+    }
+    return [tag_name for tag_name in ALLERGY_KEYWORDS if tag_name in hits]
 
 
 def extract_area_from_details(details: Dict[str, Any]) -> Optional[str]:
@@ -414,13 +454,53 @@ def infer_tag_category(tag_name: str, area_tag: Optional[str]) -> Optional[str]:
     return None
 
 
-def chunked(values: Sequence[Dict[str, Any]], size: int) -> Iterable[Sequence[Dict[str, Any]]]:
-    for i in range(0, len(values), size):
-        yield values[i : i + size]
-
-
-def fetch_all_table_rows(supabase: Client, table: str, select_expr: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+def chunked(values: Iterable[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    # Works on any iterable, so callers can stream rows without building the full list first.
+    iterator = iter(values)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def keyset_filter(key_cols: Sequence[str], last: Dict[str, Any]) -> str:
+    # PostgREST or= filter for rows after `last` in key order: (a, b) > (x, y) is
+    # a > x OR (a = x AND b > y).
+    conditions: List[str] = []
+    for i, col in enumerate(key_cols):
+        parts = [f"{prev}.eq.{last[prev]}" for prev in key_cols[:i]] + [f"{col}.gt.{last[col]}"]
+        conditions.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ",".join(conditions)
+
+
+def fetch_all_table_rows(
+    supabase: Client,
+    table: str,
+    select_expr: str,
+    page_size: int = 1000,
+    key_cols: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    """Read a whole table page by page.
+
+    With key_cols (a unique key, selected in select_expr) each page starts after the last
+    row seen, so the server walks the index instead of re-scanning every OFFSET row.
+    """
     all_rows: List[Dict[str, Any]] = []
+    if key_cols:
+        last: Optional[Dict[str, Any]] = None
+        while True:
+            query = supabase.table(table).select(select_expr)
+            for col in key_cols:
+                query = query.order(col)
+            if last is not None:
+                query = query.or_(keyset_filter(key_cols, last))
+            rows = query.limit(page_size).execute().data or []
+            all_rows.extend(rows)
+            if len(rows) < page_size:
+                return all_rows
+            last = rows[-1]
+
     offset = 0
     while True:
         response = (
@@ -437,6 +517,27 @@ def fetch_all_table_rows(supabase: Client, table: str, select_expr: str, page_si
     return all_rows
 
 
+def insert_place_tags(supabase: Client, rows: List[Dict[str, Any]]) -> int:
+    """Insert links, halving failed batches so one bad row only costs its own insert.
+
+    Returns the number of rows that could not be inserted.
+    """
+    try:
+        supabase.table("place_tags").insert(rows).execute()
+        return 0
+    except Exception:
+        pass
+    try:
+        # Usually a duplicate link in the batch; skip those and keep the rest.
+        supabase.table("place_tags").upsert(rows, on_conflict="place_id,tag_id", ignore_duplicates=True).execute()
+        return 0
+    except Exception:
+        if len(rows) == 1:
+            return 1
+    mid = len(rows) // 2
+    return insert_place_tags(supabase, rows[:mid]) + insert_place_tags(supabase, rows[mid:])
+
+
 def pick_tags_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     candidates = [
         "id, name, category",
@@ -445,7 +546,7 @@ def pick_tags_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     last_error: Optional[Exception] = None
     for select_expr in candidates:
         try:
-            rows = fetch_all_table_rows(supabase, "tags", select_expr)
+            rows = fetch_all_table_rows(supabase, "tags", select_expr, key_cols=("id",))
             return select_expr, rows
         except Exception as exc:
             last_error = exc
@@ -487,12 +588,108 @@ def extract_place_id_from_uri(uri: str) -> Optional[str]:
     return None
 
 
+class RateLimiter:
+    """Token bucket shared by worker threads: at most `rate` calls per second."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DetailsCache:
+    """Place Details payloads kept in SQLite (zlib-compressed JSON) so re-runs skip Google."""
+
+    def __init__(self, path: Path, ttl_sec: float, commit_every: int = 100) -> None:
+        self.ttl_sec = ttl_sec
+        self.commit_every = commit_every
+        self.uncommitted = 0
+        # Lookups run on worker threads; the lock serialises access to the one connection.
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS place_details(key TEXT PRIMARY KEY, fetched_at INTEGER, payload BLOB)"
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT payload FROM place_details WHERE key = ? AND fetched_at > ?",
+                (key, int(time.time() - self.ttl_sec)),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, details: Dict[str, Any]) -> None:
+        payload = zlib.compress(json.dumps(details, ensure_ascii=False).encode("utf-8"))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO place_details(key, fetched_at, payload) VALUES (?, ?, ?)",
+                (key, int(time.time()), payload),
+            )
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_every:
+                self.db.commit()
+                self.uncommitted = 0
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
 class GooglePlacesClient:
-    def __init__(self, api_key: str, delay_sec: float = 0.05) -> None:
+    def __init__(self, api_key: str, delay_sec: float = 0.05, cache: Optional[DetailsCache] = None) -> None:
         self.api_key = api_key
         self.delay_sec = delay_sec
+        self.cache = cache
+        # Safe to share between threads: calls start at most once per delay_sec overall,
+        # so concurrent lookups overlap their latency without raising the request rate.
+        self.limiter = RateLimiter(1 / delay_sec) if delay_sec > 0 else None
+        # One pooled HTTP/2 client reused by every call and worker thread, so requests skip
+        # the TCP+TLS handshake; httpx asks for gzip-encoded responses by default. HTTP/2
+        # needs h2, installed through httpx[http2] in requirements.txt.
+        self.http = httpx.Client(http2=True, timeout=10)
+
+    def close(self) -> None:
+        self.http.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _cached(self, key: str, fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        # Only found places are stored; misses may be transient errors worth retrying next run.
+        if self.cache is None:
+            return fetch()
+        details = self.cache.get(key)
+        if details is None:
+            details = fetch()
+            if details is not None:
+                self.cache.put(key, details)
+        return details
+
+    def _throttle(self) -> None:
+        if self.limiter is not None:
+            self.limiter.acquire()
 
     def place_details(self, place_id: str, fields: str = "") -> Optional[Dict[str, Any]]:
+        return self._cached(f"legacy:{place_id}:{fields}", lambda: self._place_details(place_id, fields))
+
+    def _place_details(self, place_id: str, fields: str) -> Optional[Dict[str, Any]]:
         payload, status = self._fetch_details(place_id, fields=fields)
         if status == "OK":
             return payload.get("result") or {}
@@ -506,21 +703,23 @@ class GooglePlacesClient:
         params = {"place_id": place_id, "key": self.api_key}
         if fields:
             params["fields"] = fields
-        url = "https://maps.googleapis.com/maps/api/place/details/json?" + urllib.parse.urlencode(params)
+        url = "https://maps.googleapis.com/maps/api/place/details/json"
         payload: Dict[str, Any] = {}
         status = "ERROR"
+        self._throttle()
         try:
-            with urllib.request.urlopen(url, timeout=10) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
-                status = str(payload.get("status") or "ERROR")
+            resp = self.http.get(url, params=params)
+            resp.raise_for_status()
+            payload = resp.json()
+            status = str(payload.get("status") or "ERROR")
         except Exception:
             status = "ERROR"
-        finally:
-            if self.delay_sec > 0:
-                time.sleep(self.delay_sec)
         return payload, status
 
     def place_details_new(self, place_id: str, field_mask: str = "") -> Optional[Dict[str, Any]]:
+        return self._cached(f"new:{place_id}:{field_mask}", lambda: self._place_details_new(place_id, field_mask))
+
+    def _place_details_new(self, place_id: str, field_mask: str) -> Optional[Dict[str, Any]]:
         payload, ok = self._fetch_details_new(place_id, field_mask=field_mask)
         if ok:
             return payload
@@ -533,16 +732,14 @@ class GooglePlacesClient:
             headers["X-Goog-FieldMask"] = field_mask
         payload: Dict[str, Any] = {}
         ok = False
+        self._throttle()
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
-                ok = "error" not in payload
+            resp = self.http.get(url, headers=headers)
+            resp.raise_for_status()
+            payload = resp.json()
+            ok = "error" not in payload
         except Exception:
             ok = False
-        finally:
-            if self.delay_sec > 0:
-                time.sleep(self.delay_sec)
         return payload, ok
 
     def find_place_id(self, query: str, lat: Optional[float] = None, lng: Optional[float] = None, radius_m: int = 1000) -> Optional[str]:
@@ -554,18 +751,17 @@ class GooglePlacesClient:
         }
         if lat is not None and lng is not None:
             params["locationbias"] = f"circle:{int(radius_m)}@{lat},{lng}"
-        url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json?" + urllib.parse.urlencode(params)
+        url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
         payload: Dict[str, Any] = {}
         status = "ERROR"
+        self._throttle()
         try:
-            with urllib.request.urlopen(url, timeout=10) as resp:
-                payload = json.loads(resp.read().decode("utf-8"))
-                status = str(payload.get("status") or "ERROR")
+            resp = self.http.get(url, params=params)
+            resp.raise_for_status()
+            payload = resp.json()
+            status = str(payload.get("status") or "ERROR")
         except Exception:
             status = "ERROR"
-        finally:
-            if self.delay_sec > 0:
-                time.sleep(self.delay_sec)
         if status != "OK":
             return None
         candidates = payload.get("candidates") or []
@@ -583,7 +779,7 @@ def pick_place_query(supabase: Client) -> Tuple[str, List[Dict[str, Any]]]:
     last_error: Optional[Exception] = None
     for select_expr in candidates:
         try:
-            rows = fetch_all_table_rows(supabase, "places", select_expr)
+            rows = fetch_all_table_rows(supabase, "places", select_expr, key_cols=("id",))
             return select_expr, rows
         except Exception as exc:
             last_error = exc
@@ -595,7 +791,24 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Enrich places with Google Places tags")
     parser.add_argument("--apply", action="store_true", help="Actually write changes to Supabase (default is dry-run)")
     parser.add_argument("--limit", type=int, default=0, help="Optional row limit for testing (0 means all rows)")
-    parser.add_argument("--sleep", type=float, default=0.05, help="Sleep seconds between API calls")
+    parser.add_argument(
+        "--sleep",
+        type=float,
+        default=0.05,
+        help="Minimum seconds between API calls, shared across workers (0 disables the limit)",
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent Google Places lookups")
+    parser.add_argument(
+        "--details-cache",
+        default=str(Path(__file__).resolve().parent / ".places_details_cache.sqlite"),
+        help="SQLite file caching Place Details payloads across runs ('' to disable)",
+    )
+    parser.add_argument(
+        "--details-cache-days",
+        type=float,
+        default=30,
+        help="Refetch cached Place Details older than this many days",
+    )
     parser.add_argument("--use-find", action="store_true", help="Use Find Place when gmaps_place_id is missing")
     parser.add_argument(
         "--find-radius",
@@ -642,7 +855,10 @@ def main() -> None:
         raise RuntimeError("Missing GOOGLE_PLACES_API_KEY (or GOOGLE_MAPS_API_KEY) for Places API")
 
     supabase = create_client(supabase_url, supabase_key)
-    places_client = GooglePlacesClient(api_key=maps_key, delay_sec=args.sleep)
+    details_cache = None
+    if args.details_cache:
+        details_cache = DetailsCache(Path(args.details_cache), ttl_sec=args.details_cache_days * 86400)
+    places_client = GooglePlacesClient(api_key=maps_key, delay_sec=args.sleep, cache=details_cache)
 
     fields = (args.fields or "").strip()
     if not fields:
@@ -653,7 +869,7 @@ def main() -> None:
 
     place_select, place_rows = pick_place_query(supabase)
     tags_select, tags_rows = pick_tags_query(supabase)
-    place_tag_rows = fetch_all_table_rows(supabase, "place_tags", "place_id, tag_id")
+    place_tag_rows = fetch_all_table_rows(supabase, "place_tags", "place_id, tag_id", key_cols=("place_id", "tag_id"))
 
     if args.limit > 0:
         place_rows = place_rows[: args.limit]
@@ -692,8 +908,10 @@ def main() -> None:
         except Exception:
             continue
 
+    pending_tags: List[Dict[str, Any]] = []
+
     def ensure_tag_id(tag_name: str, category: Optional[str]) -> Optional[str]:
-        nonlocal created_tags, synthetic_tag_id, failed_tag_ensures, max_tag_id
+        nonlocal created_tags, synthetic_tag_id
         clean_name = normalize_tag_name(tag_name)
         if not clean_name:
             return None
@@ -703,49 +921,73 @@ def main() -> None:
         if existing:
             return str(existing["id"])
 
-        if not args.apply:
-            synthetic = {"id": str(synthetic_tag_id), "name": clean_name}
-            if tags_has_category and category:
-                synthetic["category"] = category
-            synthetic_tag_id -= 1
-            tags_by_norm[key] = synthetic
+        synthetic = {"id": str(synthetic_tag_id), "name": clean_name}
+        if tags_has_category and category:
+            synthetic["category"] = category
+        synthetic_tag_id -= 1
+        tags_by_norm[key] = synthetic
+        if args.apply:
+            # Created in bulk by flush_pending_tags() before the links are written;
+            # until then the negative id is a placeholder.
+            pending_tags.append(synthetic)
+        else:
             created_tags += 1
-            return str(synthetic["id"])
+        return str(synthetic["id"])
 
-        insert_payload = {"name": clean_name}
-        if tags_has_category and category:
-            insert_payload["category"] = category
+    def insert_tag(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Per-tag fallback, e.g. when tags(name) has no unique index for the upsert.
         insert_error: Optional[Exception] = None
         try:
-            response = supabase.table("tags").insert(insert_payload).execute()
+            response = supabase.table("tags").insert(payload).execute()
             inserted = (response.data or [None])[0]
             if inserted and inserted.get("id") is not None:
-                tags_by_norm[key] = inserted
-                created_tags += 1
-                return str(inserted["id"])
+                return inserted
         except Exception as exc:
             insert_error = exc
 
-        inserted = find_tag_by_name(supabase, clean_name)
-        if not inserted or inserted.get("id") is None:
-            failed_tag_ensures += 1
-            if insert_error is not None:
-                print(f"[warn] Could not ensure tag '{clean_name}' ({insert_error})")
-            else:
-                print(f"[warn] Could not ensure tag '{clean_name}'")
-            return None
+        found = find_tag_by_name(supabase, payload["name"])
+        if found and found.get("id") is not None:
+            return found
+        if insert_error is not None:
+            print(f"[warn] Could not ensure tag '{payload['name']}' ({insert_error})")
+        else:
+            print(f"[warn] Could not ensure tag '{payload['name']}'")
+        return None
 
-        tags_by_norm[key] = inserted
-        return str(inserted["id"])
+    def flush_pending_tags() -> Dict[str, str]:
+        """Upsert queued tags in batches; return placeholder id -> real id."""
+        nonlocal created_tags, failed_tag_ensures
+        real_ids: Dict[str, str] = {}
+        for batch in chunked(pending_tags, 500):
+            payload = [{k: v for k, v in t.items() if k != "id"} for t in batch]
+            try:
+                # Existing names come back with their id, so no follow-up lookup is needed.
+                response = (
+                    supabase.table("tags")
+                    .upsert(payload, on_conflict="name", returning="representation")
+                    .execute()
+                )
+                upserted_rows = [r for r in (response.data or []) if r.get("id") is not None]
+            except Exception as exc:
+                print(f"[warn] Bulk tag upsert failed, inserting per tag ({exc})")
+                upserted_rows = [row for row in map(insert_tag, payload) if row]
+
+            upserted_by_norm = {normalize_text(r.get("name")): r for r in upserted_rows}
+            for placeholder in batch:
+                key = normalize_text(placeholder["name"])
+                upserted = upserted_by_norm.get(key)
+                if not upserted:
+                    failed_tag_ensures += 1
+                    continue
+                created_tags += 1
+                tags_by_norm[key] = upserted
+                real_ids[str(placeholder["id"])] = str(upserted["id"])
+        return real_ids
 
     place_tags_to_insert: List[Dict[str, Any]] = []
 
-    for place in place_rows:
-        place_id = str(place.get("id"))
-        if args.skip_if_tagged and place_id in place_ids_with_tags:
-            skipped_tagged += 1
-            continue
-
+    def lookup_place(place: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        # Runs on worker threads, so it only talks to Google and touches no shared state.
         gmaps_place_id = place.get("gmaps_place_id")
         if not gmaps_place_id:
             gmaps_place_id = extract_place_id_from_uri(str(place.get("gmaps_uri") or ""))
@@ -765,123 +1007,152 @@ def main() -> None:
                 )
 
         if not gmaps_place_id:
-            skipped_missing_place_id += 1
-            report_rows.append(
-                {
-                    "place_id": place_id,
-                    "place_name": place.get("name") or "",
-                    "status": "missing_place_id",
-                    "tags": "",
-                }
-            )
+            return None, None
+        if args.places_new:
+            return gmaps_place_id, places_client.place_details_new(str(gmaps_place_id), field_mask=fields)
+        return gmaps_place_id, places_client.place_details(str(gmaps_place_id), fields=fields)
+
+    places_to_enrich: List[Dict[str, Any]] = []
+    for place in place_rows:
+        if args.skip_if_tagged and str(place.get("id")) in place_ids_with_tags:
+            skipped_tagged += 1
             continue
+        places_to_enrich.append(place)
 
-        if args.places_new:
-            details = places_client.place_details_new(str(gmaps_place_id), field_mask=fields)
-        else:
-            details = places_client.place_details(str(gmaps_place_id), fields=fields)
-        if not details:
-            report_rows.append(
-                {
+    try:
+        # Google lookups run concurrently (paced by --sleep); results come back in input
+        # order, so tags are created and links planned exactly as in a sequential run.
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            lookups = executor.map(lookup_place, places_to_enrich)
+            for place, (gmaps_place_id, details) in zip(places_to_enrich, lookups):
+                place_id = str(place.get("id"))
+                if not gmaps_place_id:
+                    skipped_missing_place_id += 1
+                    report_rows.append(
+                        {
+                            "place_id": place_id,
+                            "place_name": place.get("name") or "",
+                            "status": "missing_place_id",
+                            "tags": "",
+                        }
+                    )
+                    continue
+
+                if not details:
+                    report_rows.append(
+                        {
+                            "place_id": place_id,
+                            "place_name": place.get("name") or "",
+                            "status": "details_not_found",
+                            "tags": "",
+                            "details_json": "" if args.report_details else None,
+                        }
+                    )
+                    continue
+
+                reviews_text = extract_reviews_text(details.get("reviews"))
+                editorial_summary = ""
+                if isinstance(details.get("editorial_summary"), dict):
+                    editorial_summary = str(details["editorial_summary"].get("overview") or "").strip()
+                elif isinstance(details.get("editorialSummary"), dict):
+                    editorial_summary = str(details["editorialSummary"].get("overview") or "").strip()
+                elif details.get("editorial_summary"):
+                    editorial_summary = str(details.get("editorial_summary") or "").strip()
+                elif details.get("editorialSummary"):
+                    editorial_summary = str(details.get("editorialSummary") or "").strip()
+
+                types_text = " ".join([str(t) for t in (details.get("types") or []) if t])
+                details_name = str(details.get("name") or "")
+                if args.places_new:
+                    display = details.get("displayName")
+                    if isinstance(display, dict):
+                        details_name = str(display.get("text") or "") or details_name
+                    details_name = details_name or str(place.get("name") or "")
+                combined_text = " ".join(
+                    part
+                    for part in [
+                        details_name,
+                        types_text,
+                        editorial_summary,
+                        reviews_text,
+                    ]
+                    if part
+                )
+
+                type_cuisine_tags = infer_cuisine_tags_from_types(extract_place_types(details))
+                # One keyword scan of the place text feeds both the cuisine and allergy inference.
+                keyword_hits = scan_keywords(combined_text)
+                text_cuisine_tags = infer_cuisine_tags(keyword_hits)
+                cuisine_tags = type_cuisine_tags + [t for t in text_cuisine_tags if t not in type_cuisine_tags]
+                if not cuisine_tags:
+                    cuisine_tags = [DEFAULT_CUISINE_TAG]
+                allergy_tags = infer_allergy_tags(keyword_hits) if args.include_allergies else []
+                price_level = details.get("price_level")
+                if price_level is None:
+                    price_level = details.get("priceLevel")
+                price_tag = infer_price_range_tag(price_level, combined_text)
+                area_tag = infer_area_tag(details)
+
+                proposed = [t for t in [area_tag, *cuisine_tags, price_tag, *allergy_tags] if t]
+                seen_norm: Set[str] = set()
+                deduped: List[str] = []
+                for tag in proposed:
+                    if not tag or not is_english_tag(tag):
+                        continue
+                    key = normalize_text(tag)
+                    if key in seen_norm:
+                        continue
+                    seen_norm.add(key)
+                    deduped.append(tag)
+
+                row_links = 0
+                for tag_name in deduped:
+                    category = infer_tag_category(tag_name, area_tag)
+                    tag_id = ensure_tag_id(tag_name, category)
+                    if not tag_id:
+                        continue
+                    pair = (place_id, tag_id)
+                    if pair in existing_pairs:
+                        continue
+                    existing_pairs.add(pair)
+                    planned_links += 1
+                    row_links += 1
+                    place_tags_to_insert.append({"place_id": place_id, "tag_id": tag_id})
+
+                report_row: Dict[str, Any] = {
                     "place_id": place_id,
                     "place_name": place.get("name") or "",
-                    "status": "details_not_found",
-                    "tags": "",
-                    "details_json": "" if args.report_details else None,
+                    "status": "ok",
+                    "tags": "|".join(deduped),
+                    "area_tag": area_tag or "",
+                    "allergy_tags": "|".join(allergy_tags),
+                    "new_links_planned_or_inserted": row_links,
                 }
-            )
-            continue
-
-        reviews_text = extract_reviews_text(details.get("reviews"))
-        editorial_summary = ""
-        if isinstance(details.get("editorial_summary"), dict):
-            editorial_summary = str(details["editorial_summary"].get("overview") or "").strip()
-        elif isinstance(details.get("editorialSummary"), dict):
-            editorial_summary = str(details["editorialSummary"].get("overview") or "").strip()
-        elif details.get("editorial_summary"):
-            editorial_summary = str(details.get("editorial_summary") or "").strip()
-        elif details.get("editorialSummary"):
-            editorial_summary = str(details.get("editorialSummary") or "").strip()
-
-        types_text = " ".join([str(t) for t in (details.get("types") or []) if t])
-        details_name = str(details.get("name") or "")
-        if args.places_new:
-            display = details.get("displayName")
-            if isinstance(display, dict):
-                details_name = str(display.get("text") or "") or details_name
-            details_name = details_name or str(place.get("name") or "")
-        combined_text = " ".join(
-            part
-            for part in [
-                details_name,
-                types_text,
-                editorial_summary,
-                reviews_text,
-            ]
-            if part
-        )
-
-        type_cuisine_tags = infer_cuisine_tags_from_types(extract_place_types(details))
-        text_cuisine_tags = infer_cuisine_tags(combined_text)
-        cuisine_tags = type_cuisine_tags + [t for t in text_cuisine_tags if t not in type_cuisine_tags]
-        if not cuisine_tags:
-            cuisine_tags = [DEFAULT_CUISINE_TAG]
-        allergy_tags = infer_allergy_tags(combined_text) if args.include_allergies else []
-        price_level = details.get("price_level")
-        if price_level is None:
-            price_level = details.get("priceLevel")
-        price_tag = infer_price_range_tag(price_level, combined_text)
-        area_tag = infer_area_tag(details)
-
-        proposed = [t for t in [area_tag, *cuisine_tags, price_tag, *allergy_tags] if t]
-        seen_norm: Set[str] = set()
-        deduped: List[str] = []
-        for tag in proposed:
-            if not tag or not is_english_tag(tag):
-                continue
-            key = normalize_text(tag)
-            if key in seen_norm:
-                continue
-            seen_norm.add(key)
-            deduped.append(tag)
-
-        row_links = 0
-        for tag_name in deduped:
-            category = infer_tag_category(tag_name, area_tag)
-            tag_id = ensure_tag_id(tag_name, category)
-            if not tag_id:
-                continue
-            pair = (place_id, tag_id)
-            if pair in existing_pairs:
-                continue
-            existing_pairs.add(pair)
-            planned_links += 1
-            row_links += 1
-            place_tags_to_insert.append({"place_id": place_id, "tag_id": tag_id})
-
-        report_row: Dict[str, Any] = {
-            "place_id": place_id,
-            "place_name": place.get("name") or "",
-            "status": "ok",
-            "tags": "|".join(deduped),
-            "area_tag": area_tag or "",
-            "allergy_tags": "|".join(allergy_tags),
-            "new_links_planned_or_inserted": row_links,
-        }
-        if args.report_details:
-            report_row["details_json"] = json.dumps(details, ensure_ascii=False)
-        report_rows.append(report_row)
+                if args.report_details:
+                    report_row["details_json"] = json.dumps(details, ensure_ascii=False)
+                report_rows.append(report_row)
+    finally:
+        places_client.close()
+
+    if args.apply and pending_tags:
+        real_ids = flush_pending_tags()
+        placeholder_ids = {str(t["id"]) for t in pending_tags}
+        resolved_links: List[Dict[str, Any]] = []
+        for link in place_tags_to_insert:
+            if link["tag_id"] in placeholder_ids:
+                tag_id = real_ids.get(link["tag_id"])
+                # Tag could not be created, or it resolved to a link that already exists.
+                if tag_id is None or (link["place_id"], tag_id) in existing_pairs:
+                    planned_links -= 1
+                    continue
+                existing_pairs.add((link["place_id"], tag_id))
+                link = {"place_id": link["place_id"], "tag_id": tag_id}
+            resolved_links.append(link)
+        place_tags_to_insert = resolved_links
 
     if args.apply and place_tags_to_insert:
-        for batch in chunked(place_tags_to_insert, 250):
-            try:
-                supabase.table("place_tags").insert(list(batch)).execute()
-            except Exception:
-                for row in batch:
-                    try:
-                        supabase.table("place_tags").insert(row).execute()
-                    except Exception:
-                        failed_link_inserts += 1
+        for batch in chunked(place_tags_to_insert, 1000):
+            failed_link_inserts += insert_place_tags(supabase, batch)
 
     print("\nSummary")
     print(f"- Existing tags loaded: {len(tags_rows)}")
@@ -0,0 +1,11 @@
+# Production server settings. gunicorn reads this file automatically when started from
+# backend/:  gunicorn app:app
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+# Chats block on Gemini/Supabase/Google I/O, so each worker serves requests on threads.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+# LLM calls can take a while; don't let the arbiter kill a worker mid-chat.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
@@ -0,0 +1,134 @@
+-- SQL functions called by backend/app.py and backend/auto_tag_places.py through supabase.rpc(...).
+-- Run this file in the Supabase SQL editor after the places/tags/place_tags tables exist.
+-- Both scripts fall back to plain table queries when a function is missing.
+
+-- Places linked to every tag in tag_names (AND match), in a single round trip.
+-- `tags` carries all of each place's tag names so the LLM ranking needs no follow-up query.
+-- (The drop is needed once when upgrading from the version without the tags column.)
+drop function if exists get_places_by_all_tags(text[], int);
+
+create or replace function get_places_by_all_tags(tag_names text[], lim int default 5)
+returns table (
+    id places.id%type,
+    name places.name%type,
+    address places.address%type,
+    gmaps_uri places.gmaps_uri%type,
+    tags text[]
+)
+language sql
+stable
+as $$
+    select p.id, p.name, p.address, p.gmaps_uri,
+        (
+            select array_agg(distinct t2.name order by t2.name)
+            from place_tags pt2
+            join tags t2 on t2.id = pt2.tag_id
+            where pt2.place_id = p.id
+        ) as tags
+    from places p
+    join place_tags pt on pt.place_id = p.id
+    join tags t on t.id = pt.tag_id
+    where t.name = any(tag_names)
+    group by p.id
+    having count(distinct t.name) = (select count(distinct n) from unnest(tag_names) as n)
+    order by p.id
+    limit lim;
+$$;
+
+create index if not exists place_tags_tag_id_idx on place_tags (tag_id);
+
+-- Nearest places to a point, filtered like apply_rules_to_db. Requires PostGIS
+-- (Database -> Extensions in the Supabase dashboard, or the statement below).
+create extension if not exists postgis;
+
+alter table places
+    add column if not exists geog geography(Point, 4326)
+    generated always as (st_setsrid(st_makepoint(longitude, latitude), 4326)::geography) stored;
+
+create index if not exists places_geog_idx on places using gist (geog);
+
+create or replace function nearest_places(
+    user_lat float8,
+    user_lng float8,
+    lim int default 5,
+    price_exact int default null,
+    max_price int default null,
+    required_types text[] default '{}'
+)
+returns setof jsonb
+language sql
+stable
+as $$
+    -- Same columns as PLACE_FILTER_COLUMNS in app.py, plus distance_km.
+    select jsonb_build_object(
+        'id', p.id,
+        'name', p.name,
+        'address', p.address,
+        'gmaps_uri', p.gmaps_uri,
+        'latitude', p.latitude,
+        'longitude', p.longitude,
+        'price_level', p.price_level,
+        'types', p.types,
+        'distance_km', round((st_distance(p.geog, o.pt) / 1000)::numeric, 2)
+    )
+    from places p,
+        (select st_setsrid(st_makepoint(user_lng, user_lat), 4326)::geography as pt) o
+    where p.geog is not null
+      and (price_exact is null or p.price_level = price_exact)
+      and (max_price is null or p.price_level <= max_price)
+      and p.types @> required_types
+    order by p.geog <-> o.pt
+    limit lim;
+$$;
+
+-- auto_tag_places.py --apply upserts new tags on name, which needs a unique index.
+create unique index if not exists tags_name_key on tags (name);
+
+-- auto_tag_places.py --apply: create missing tags and link them to places in one
+-- transaction. rows is a jsonb array of {place_id, tag_name, category}; returns how
+-- many tags and links were actually new. The script falls back to table inserts without it.
+-- (The drop is needed once when upgrading from the version that returned a single int.)
+create unique index if not exists place_tags_place_tag_key on place_tags (place_id, tag_id);
+
+drop function if exists auto_tag_apply(jsonb);
+
+create or replace function auto_tag_apply(rows jsonb)
+returns table (new_tags int, new_links int)
+language sql
+as $$
+    with input as (
+        -- place_id is read with place_tags.place_id's own type so the join below
+        -- compares places.id directly and can use its primary key index.
+        select distinct
+            (jsonb_populate_record(null::place_tags, r)).place_id,
+            r->>'tag_name' as tag_name,
+            r->>'category' as category
+        from jsonb_array_elements(rows) as r
+    ),
+    new_tags as (
+        insert into tags (name, category)
+        select distinct on (tag_name) tag_name, category
+        from input
+        order by tag_name
+        on conflict (name) do nothing
+        returning id, name
+    ),
+    -- Rows inserted above are not visible to this statement's snapshot of tags.
+    all_tags as (
+        select id, name from new_tags
+        union all
+        select t.id, t.name from tags t where t.name in (select tag_name from input)
+    ),
+    inserted as (
+        insert into place_tags (place_id, tag_id)
+        select p.id, t.id
+        from input i
+        join all_tags t on t.name = i.tag_name
+        join places p on p.id = i.place_id
+        on conflict do nothing
+        returning 1
+    )
+    select
+        (select count(*)::int from new_tags),
+        (select count(*)::int from inserted);
+$$;